@@ -0,0 +1,81 @@
+# file: benchmarks/bench_icon_transform.py
+"""
+Micro-benchmark of the invert-and-flatten icon transform.
+
+    python -m benchmarks.bench_icon_transform [--keys 8] [--size 120] [--repeat 200]
+
+Compares the original PIL channel chain against the NumPy path over a page of
+keys, one icon at a time as the render pipeline runs it.
+"""
+import argparse
+import random
+import timeit
+
+from PIL import Image, ImageDraw
+
+from classes import icon_transform
+from classes.icon_transform import _pil_invert_over_black, invert_over_black
+
+
+def make_icons(count: int, size: int):
+    """
+    Anti-aliased black shapes on a transparent background, like the MDI icons.
+    """
+    rng = random.Random(0)
+    icons = []
+    for _ in range(count):
+        # Draw large and downscale so the edges get partial alpha, as after LANCZOS
+        big = Image.new("RGBA", (size * 4, size * 4), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(big)
+        for _ in range(6):
+            x0, y0 = rng.randrange(size * 3), rng.randrange(size * 3)
+            draw.ellipse((x0, y0, x0 + rng.randrange(8, size), y0 + rng.randrange(8, size)), fill=(0, 0, 0, 255))
+        icons.append(big.resize((size, size), Image.LANCZOS))
+    return icons
+
+
+def value_grid() -> Image.Image:
+    """
+    Every channel value (along x) at every alpha (along y). Inverted black shapes
+    only ever reach the tint as 255, which every rounding agrees on.
+    """
+    grid = Image.new("RGBA", (256, 256))
+    grid.putdata([(x, 255 - x, x // 2, y) for y in range(256) for x in range(256)])
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--keys", type=int, default=8, help="Icons per page (default: 8)")
+    parser.add_argument("--size", type=int, default=120, help="Key size in pixels (default: 120)")
+    parser.add_argument("--repeat", type=int, default=200, help="Pages per measurement (default: 200)")
+    args = parser.parse_args(argv)
+
+    if icon_transform.np is None:
+        print("NumPy is not installed; only the PIL chain is available.")
+        return
+
+    icons = make_icons(args.keys, args.size)
+    # Both paths must produce the same pixels, bit for bit, before comparing their speed
+    tint = (255, 128, 0)
+    for icon in icons:
+        assert _pil_invert_over_black(icon).tobytes() == invert_over_black(icon).tobytes()
+        assert _pil_invert_over_black(icon, tint).tobytes() == invert_over_black(icon, tint).tobytes()
+    grid = value_grid()
+    for grid_tint in (None, tint, (1, 77, 254)):
+        assert _pil_invert_over_black(grid, grid_tint).tobytes() == invert_over_black(grid, grid_tint).tobytes()
+
+    cases = {
+        "pil_chain": lambda: [_pil_invert_over_black(icon) for icon in icons],
+        "numpy_per_icon": lambda: [invert_over_black(icon) for icon in icons],
+    }
+    baseline = None
+    print(f"{args.keys} icons of {args.size}x{args.size}, {args.repeat} pages")
+    for name, case in cases.items():
+        per_page = min(timeit.repeat(case, number=args.repeat, repeat=7)) / args.repeat
+        baseline = baseline or per_page
+        print(f"{name:>16}: {per_page * 1e6:8.1f} us/page  ({baseline / per_page:4.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,602 @@
+# file: benchmarks/bench_suite.py
+"""
+End-to-end benchmarks on a FakeStreamDeck, written as JSON so runs can be compared.
+
+    python -m benchmarks.bench_suite [--out results.json] [--compare baseline.json]
+    python -m benchmarks.bench_suite --only cold_render warm_render
+
+Measures cold page renders (empty icon cache), warm re-renders, navigation
+through a deep create_child chain, first visits to prefetched config pages, dial spin throughput, two decks rendering
+side by side (one of them slow), reconnecting an unplugged deck, page
+transitions on a fast and a slow deck, rendering on a process pool from an
+atlas, cold start (importing main.py and the
+first frame with and without the frame store) and peak memory of a large page tree. Rendering uses the real pipeline, so cairosvg needs libcairo.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.fake_deck import FakeStreamDeck
+from classes.animation import animator
+from classes.base import ItemState
+from classes.device_monitor import DeviceMonitor
+from classes.frame_store import FrameStore
+from classes.icon_atlas import IconAtlas, compile_atlas
+from classes.icon_cache import IconCache, icon_cache
+from classes.icon_catalog import IconCatalog
+from classes.page import Page
+from classes.page_config import PageTree
+from classes.page_manager import PageManager
+from classes.render_pipeline import render_pipeline
+from classes.strip_compositor import StripUpdate
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def summarize(samples: List[float]) -> dict:
+    """
+    Millisecond statistics for a list of durations in seconds.
+    """
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "min_ms": ordered[0] * 1e3,
+        "median_ms": statistics.median(ordered) * 1e3,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e3,
+        "max_ms": ordered[-1] * 1e3,
+    }
+
+
+def icon_paths(count: int, offset: int = 0) -> List[str]:
+    paths = sorted(glob.glob("Icons/*.svg"))
+    if len(paths) < offset + count:
+        raise SystemExit("Run the benchmarks from the repository root (Icons/ not found)")
+    return paths[offset:offset + count]
+
+
+def new_manager(deck: FakeStreamDeck = None) -> PageManager:
+    deck = deck or FakeStreamDeck()
+    manager = PageManager(deck.get_serial_number())
+    manager.set_deck(deck)
+    # Transitions are measured on their own (see bench_transition)
+    manager.page_transition = manager.state_transition = "none"
+    # Measure rasterizing, not whatever atlas happens to be compiled locally
+    icon_cache.detach_atlases()
+    return manager
+
+
+def fill_page(page: Page, icons: List[str]):
+    """
+    Put one single-state button per icon on every free key of the page.
+    """
+    deck = page.super.deck
+    keys = [(row, col) for row in range(deck.KEY_ROWS) for col in range(deck.KEY_COLS)
+            if page.button(row, col) is None]
+    for (row, col), icon in zip(keys, icons):
+        page.create_button((row, col), [ItemState(icon, os.path.basename(icon))], None)
+
+
+async def timed_render(manager: PageManager, page: Page) -> float:
+    """
+    Seconds from starting a page render to the last device write it caused.
+    """
+    deck = manager.deck
+    deck.clear_writes()
+    start = time.perf_counter()
+    await manager.render_page(page)
+    end = deck.writes[-1].time if deck.writes else time.perf_counter()
+    return end - start
+
+
+async def bench_cold_render(args) -> dict:
+    samples = []
+    for repeat in range(args.repeat):
+        manager = new_manager()
+        icon_cache.clear()
+        page = Page(manager, "Cold")
+        # A new icon set each time, so nothing below the icon cache can help either
+        fill_page(page, icon_paths(manager.deck.KEY_COUNT, offset=repeat * manager.deck.KEY_COUNT))
+        samples.append(await timed_render(manager, page))
+    return summarize(samples)
+
+
+async def bench_warm_render(args) -> dict:
+    manager = new_manager()
+    page = Page(manager, "Warm")
+    fill_page(page, icon_paths(manager.deck.KEY_COUNT))
+    await manager.render_page(page)
+    rewrite, unchanged = [], []
+    for _ in range(args.repeat):
+        # Every key re-sent from cached frames, as after a deck reset
+        manager.invalidate_frames()
+        rewrite.append(await timed_render(manager, page))
+        # Nothing changed, so nothing may be written
+        unchanged.append(await timed_render(manager, page))
+    return {"rewrite": summarize(rewrite), "unchanged": summarize(unchanged),
+            "unchanged_writes": len(manager.deck.writes)}
+
+
+async def bench_navigation(args) -> dict:
+    manager = new_manager()
+    icon_cache.clear()
+    root = Page(manager, "Root")
+    pages = [root]
+    icons = icon_paths(args.depth * 2 + 8, offset=200)
+    for level in range(args.depth):
+        pages.append(pages[-1].create_child(f"Level {level + 1}", icons[level], (0, 3)))
+    # Filled once every link is in place, so the (0, 3) links keep their key
+    for level, page in enumerate(pages[1:]):
+        fill_page(page, icons[args.depth + level:args.depth + level + 4])
+    await manager.set_current_page(root)
+
+    async def walk() -> List[float]:
+        samples = []
+        for page in pages[1:]:
+            start = time.perf_counter()
+            await manager.go_to_page(page)
+            samples.append(time.perf_counter() - start)
+        for _ in pages[1:]:
+            start = time.perf_counter()
+            await manager.go_back()
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    cold = await walk()
+    warm = []
+    for _ in range(args.repeat):
+        warm += await walk()
+    manager.cancel_prefetch()
+    return {"depth": args.depth, "cold": summarize(cold), "warm": summarize(warm)}
+
+
+async def bench_prefetch(args) -> dict:
+    """
+    Start on the root of a config page tree and open each child page once prefetch
+    is done. Children are not built before their first visit, so this shows
+    whether prefetch reaches them through the tree: every miss is a cold render.
+    Run once with an empty icon cache and once with one already full of other
+    frames, as in a long-running process.
+    """
+    results = {}
+    for name, prefill in (("empty_cache", False), ("full_cache", True)):
+        manager = new_manager()
+        icon_cache.clear()
+        if prefill:
+            for index in range(icon_cache.max_entries):
+                icon_cache.put(("prefill", index), b"\0" * 64)
+        icons = iter(icon_paths(manager.deck.KEY_COUNT * 4, offset=600))
+        keys = [[row, col] for row in range(manager.deck.KEY_ROWS) for col in range(manager.deck.KEY_COLS)][1:]
+        pages = {"root": {"name": "Root", "children": []}}
+        for index in range(3):
+            page_id = f"child{index}"
+            pages["root"]["children"].append({"page": page_id, "key": keys[index], "icon": next(icons)})
+            pages[page_id] = {"name": f"Child {index}",
+                              "buttons": [{"key": key, "states": [{"image": next(icons)}]} for key in keys]}
+        tree = PageTree(manager, {"root": "root", "pages": pages})
+        await manager.set_current_page(tree.root)
+        misses, samples = [], []
+        for link in pages["root"]["children"]:
+            await manager._prefetch_task
+            before = icon_cache.misses
+            start = time.perf_counter()
+            await manager.go_to_page(tree.get(link["page"]))
+            samples.append(time.perf_counter() - start)
+            misses.append(icon_cache.misses - before)
+            await manager.go_back()
+        manager.cancel_prefetch()
+        await manager.stop()
+        results[name] = {"first_visit": summarize(samples), "misses": sum(misses)}
+    return results
+
+
+async def bench_dial(args) -> dict:
+    manager = new_manager()
+    page = Page(manager, "Dial")
+    delivered = {"calls": 0, "steps": 0}
+
+    async def rotated(direction, step):
+        delivered["calls"] += 1
+        delivered["steps"] += step
+
+    page.create_dial(0, [ItemState(None, "Down"), ItemState(None, "Volume"), ItemState(None, "Up")], rotated)
+    await manager.set_current_page(page)
+    manager.start()
+
+    start = time.perf_counter()
+    for tick in range(args.ticks):
+        manager.rotate_dial(0, 1)
+        if tick % args.ticks_per_read == 0:
+            # The USB reader thread hands over a few ticks per loop iteration
+            await asyncio.sleep(0)
+    aggregator = manager._dial_aggregators[0]
+    while aggregator._task is not None and not aggregator._task.done():
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    await manager.stop()
+    return {
+        "ticks": args.ticks,
+        "elapsed_ms": elapsed * 1e3,
+        "ticks_per_second": args.ticks / elapsed,
+        "action_calls": delivered["calls"],
+        "delivered_steps": delivered["steps"],
+    }
+
+
+async def bench_multi_deck(args) -> dict:
+    """
+    Two decks show the same icons. The second deck should find them all in the
+    shared icon cache, and the fast deck's renders should not wait for the slow one's writes.
+    """
+    fast = new_manager(FakeStreamDeck("FAST"))
+    slow = new_manager(FakeStreamDeck("SLOW", write_delay=args.slow_write_ms / 1e3))
+    icon_cache.clear()
+    icons = icon_paths(fast.deck.KEY_COUNT, offset=100)
+    fast_page, slow_page = Page(fast, "Fast"), Page(slow, "Slow")
+    fill_page(fast_page, icons)
+    fill_page(slow_page, icons)
+    await fast.render_page(fast_page)
+    misses = icon_cache.misses
+    await slow.render_page(slow_page)
+    second_deck_misses = icon_cache.misses - misses
+
+    alone, beside_slow = [], []
+    for _ in range(args.repeat):
+        fast.invalidate_frames()
+        alone.append(await timed_render(fast, fast_page))
+        fast.invalidate_frames()
+        slow.invalidate_frames()
+        slow_render = asyncio.create_task(slow.render_page(slow_page))
+        beside_slow.append(await timed_render(fast, fast_page))
+        await slow_render
+    await fast.stop()
+    await slow.stop()
+    return {"slow_write_ms": args.slow_write_ms, "second_deck_misses": second_deck_misses,
+            "alone": summarize(alone), "beside_slow": summarize(beside_slow)}
+
+
+async def bench_reconnect(args) -> dict:
+    """
+    Unplug and replug a deck through the DeviceMonitor. The page comes back from
+    the manager's remembered frames; for comparison, the restart path re-renders
+    it with a cold icon cache.
+    """
+    connected = [FakeStreamDeck("HOTPLUG")]
+    manager = new_manager(connected[0])
+    page = Page(manager, "Hotplug")
+    fill_page(page, icon_paths(manager.deck.KEY_COUNT, offset=300))
+    await manager.set_current_page(page)
+    manager.cancel_prefetch()
+
+    async def existing(deck, serial):
+        return manager
+
+    monitor = DeviceMonitor(existing, enumerate_decks=lambda: list(connected))
+    await monitor.poll()
+    replay, rerender, replayed = [], [], 0
+    for _ in range(args.repeat):
+        connected.pop().unplug()
+        await monitor.poll()
+        deck = FakeStreamDeck("HOTPLUG")
+        connected.append(deck)
+        start = time.perf_counter()
+        await monitor.poll()
+        replay.append(deck.writes[-1].time - start)
+        replayed = len(deck.writes)
+
+        icon_cache.clear()
+        manager.invalidate_frames()
+        rerender.append(await timed_render(manager, page))
+    await manager.stop()
+    return {"replayed_writes": replayed,
+            "replay": summarize(replay), "cold_rerender": summarize(rerender)}
+
+
+async def bench_transition(args) -> dict:
+    """
+    Slide between two pages. The first slide precomputes the frame sequence, later
+    ones replay it from the animator's cache. On the slow deck the writes cannot
+    keep up, so frames are dropped, but the slide should still take about transition_time.
+    Slides play in the background: press_ms is how long a page-changing press holds
+    up the event consumer, and rapid_ms three presses in a row, each cutting the
+    previous slide short. Neither should be anywhere near transition_time.
+    """
+    results = {}
+    for name, deck in (("fast", FakeStreamDeck("SLIDE")),
+                       ("slow", FakeStreamDeck("SLIDE-SLOW", write_delay=args.slow_write_ms / 1e3))):
+        manager = new_manager(deck)
+        manager.page_transition = "slide"
+        root, child = Page(manager, "Root"), Page(manager, "Child")
+        child.parent = root
+        fill_page(root, icon_paths(manager.deck.KEY_COUNT, offset=400))
+        fill_page(child, icon_paths(manager.deck.KEY_COUNT, offset=420))
+        await manager.set_current_page(root)
+        before = animator.stats()
+        first, cached, presses, rapid = None, [], [], []
+        # One extra run: the first builds the transition, the rest are 'cached'
+        for _ in range(args.repeat + 1):
+            start = time.perf_counter()
+            await manager.go_to_page(child)
+            presses.append(time.perf_counter() - start)
+            await manager.finish_transition()
+            elapsed = time.perf_counter() - start
+            if first is None:
+                first = elapsed
+            else:
+                cached.append(elapsed)
+            await manager.go_back()
+            await manager.finish_transition()
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            await manager.go_to_page(child)
+            await manager.go_back()
+            await manager.go_to_page(child)
+            rapid.append(time.perf_counter() - start)
+            await manager.finish_transition()
+            await manager.go_back()
+            await manager.finish_transition()
+        manager.cancel_prefetch()
+        after = animator.stats()
+        await manager.stop()
+        results[name] = {"first_ms": first * 1e3, "cached": summarize(cached),
+                         "press": summarize(presses), "rapid": summarize(rapid),
+                         "transition_ms": manager.transition_time * 1e3,
+                         "played": after["played"] - before["played"],
+                         "dropped": after["dropped"] - before["dropped"]}
+    results["cached_sequences"] = animator.stats()["sequences"]
+    return results
+
+
+IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start, *[name for name in ("PIL", "cairosvg", "StreamDeck") if name in sys.modules])
+"""
+
+
+async def bench_process_pool(args) -> dict:
+    """
+    Titled keys, a touchscreen tile and a page transition drawn on a process pool
+    from a freshly compiled atlas. Atlas tiles are memoryviews of the mapped file,
+    so everything sent to the workers must be converted first; failures counts
+    the renders that raised and must be 0.
+    """
+    deck = FakeStreamDeck("PROCESSES")
+    manager = new_manager(deck)
+    manager.page_transition = "slide"
+    size = deck.key_image_format()["size"]
+    icons = icon_paths(deck.KEY_COUNT * 2, offset=700)
+    processes = render_pipeline.use_processes
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "icons.atlas")
+        compile_atlas(icons, size, path, workers=2)
+        icon_cache.clear()
+        icon_cache.attach_atlas(IconAtlas(path))
+        render_pipeline.configure(use_processes=True)
+        try:
+            root, child = Page(manager, "Root"), Page(manager, "Child")
+            child.parent = root
+            fill_page(root, icons[:deck.KEY_COUNT])
+            fill_page(child, icons[deck.KEY_COUNT:])
+            atlas_hits = icon_cache.atlas_hits
+            start = time.perf_counter()
+            for render in (manager.set_current_page(root), manager.go_to_page(child), manager.finish_transition(),
+                           manager.strip_compositor.compose([StripUpdate((0, 0, 200, 100), icons[0], title="Strip")])):
+                try:
+                    await render
+                except Exception as e:
+                    logger.error("Render on the process pool failed: %s", e)
+                    failures += 1
+            elapsed = time.perf_counter() - start
+            atlas_hits = icon_cache.atlas_hits - atlas_hits
+        finally:
+            manager.cancel_prefetch()
+            await manager.stop()
+            render_pipeline.configure(use_processes=processes)
+            icon_cache.detach_atlases()
+    return {"elapsed_ms": elapsed * 1e3, "atlas_hits": atlas_hits, "failures": failures}
+
+
+async def bench_startup(args) -> dict:
+    """
+    Cold start: importing main.py in a fresh interpreter (and which heavy modules
+    that pulls in), then the first frame of a page rendered from an empty icon
+    cache versus one seeded from the frame store, as main.py does on a warm start.
+    edited_icon_frames_loaded counts stored frames of an icon edited in place after
+    the store was written that loading still let through; it must be 0.
+    """
+    imports, heavy = [], []
+    for _ in range(args.repeat):
+        probe = subprocess.run([sys.executable, "-c", IMPORT_PROBE], capture_output=True, text=True, check=True)
+        seconds, *heavy = probe.stdout.split()
+        imports.append(float(seconds))
+
+    manager = new_manager()
+    page = Page(manager, "Startup")
+    fill_page(page, icon_paths(manager.deck.KEY_COUNT, offset=500))
+    cold, warm, stored = [], [], {}
+    with tempfile.TemporaryDirectory() as directory:
+        store = FrameStore(os.path.join(directory, "first-frames.bin"))
+        for _ in range(args.repeat):
+            icon_cache.clear()
+            manager.invalidate_frames()
+            icon_cache.start_recording()
+            cold.append(await timed_render(manager, page))
+            store.save(icon_cache.stop_recording())
+
+            icon_cache.clear()
+            manager.invalidate_frames()
+            misses = icon_cache.misses
+            start = time.perf_counter()
+            stored = store.load(icon_cache)
+            # Reading the store counts towards the warm first frame
+            warm.append(time.perf_counter() - start + await timed_render(manager, page))
+            misses = icon_cache.misses - misses
+
+        icon_dir = os.path.join(directory, "Icons")
+        os.makedirs(icon_dir)
+        icon = shutil.copy(icon_paths(1, offset=500)[0], icon_dir)
+        size = manager.deck.key_image_format()["size"]
+        edited_store = FrameStore(os.path.join(directory, "edited.bin"))
+        edited_store.save({IconCache(catalog=IconCatalog(icon_dir, cache_path=None)).key_for(icon, size): b"stale"})
+        with open(icon, "a", encoding="utf-8") as f:
+            f.write("<!-- edited -->\n")
+        edited = edited_store.load(IconCache(catalog=IconCatalog(icon_dir, cache_path=None)))
+    await manager.stop()
+    return {"import_main": summarize(imports), "heavy_modules_after_import": heavy,
+            "first_frame_cold": summarize(cold), "first_frame_from_store": summarize(warm),
+            "stored_frames": len(stored), "store_misses": misses, "edited_icon_frames_loaded": len(edited)}
+
+
+async def bench_memory(args) -> dict:
+    icon_cache.clear()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    manager = new_manager()
+    root = Page(manager, "Root")
+    pages, frontier = [root], [root]
+    icons = icon_paths(16)
+    # Breadth-first tree: every page links to as many children as it has free keys
+    while len(pages) < args.pages:
+        parent = frontier.pop(0)
+        for col in range(1, manager.deck.KEY_COLS):
+            for row in range(manager.deck.KEY_ROWS):
+                if len(pages) >= args.pages:
+                    break
+                child = parent.create_child(f"Page {len(pages)}", icons[len(pages) % len(icons)], (row, col))
+                if child is not None:
+                    pages.append(child)
+                    frontier.append(child)
+    built = tracemalloc.get_traced_memory()[0]
+    await manager.set_current_page(root)
+    manager.cancel_prefetch()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {
+        "pages": len(pages),
+        "tree_mb": (built - before) / 2 ** 20,
+        "bytes_per_page": (built - before) / len(pages),
+        "peak_mb": (peak - before) / 2 ** 20,
+        "cache_mb": icon_cache.total_bytes / 2 ** 20,
+    }
+    try:
+        import resource
+        # kilobytes on Linux
+        result["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        pass
+    return result
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    "cold_render": bench_cold_render,
+    "warm_render": bench_warm_render,
+    "navigation": bench_navigation,
+    "prefetch": bench_prefetch,
+    "dial_spin": bench_dial,
+    "multi_deck": bench_multi_deck,
+    "reconnect": bench_reconnect,
+    "transition": bench_transition,
+    "process_pool": bench_process_pool,
+    "startup": bench_startup,
+    # Last, so the peak is not inflated by the other benchmarks' allocations
+    "memory": bench_memory,
+}
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "render_workers": render_pipeline.workers,
+        "render_processes": render_pipeline.use_processes,
+    }
+
+
+def flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict):
+    """
+    Print every numeric result next to the baseline's.
+    """
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    print(f"{'metric':<36} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, value in new.items():
+        if name not in old:
+            continue
+        change = f"{(value / old[name] - 1) * 100:+7.1f}%" if old[name] else ""
+        print(f"{name:<36} {old[name]:>12.3f} {value:>12.3f} {change:>8}")
+
+
+async def run(args) -> dict:
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if args.only and name not in args.only:
+            continue
+        logger.info("Running %s...", name)
+        results[name] = await bench(args)
+    render_pipeline.shutdown()
+    return {"meta": metadata(), "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against an earlier --out file")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=10, help="Samples per render benchmark (default: 10)")
+    parser.add_argument("--depth", type=int, default=30, help="Navigation tree depth (default: 30)")
+    parser.add_argument("--ticks", type=int, default=20_000, help="Dial ticks to spin (default: 20000)")
+    parser.add_argument("--ticks-per-read", type=int, default=8, help="Dial ticks per loop iteration (default: 8)")
+    parser.add_argument("--slow-write-ms", type=float, default=20.0,
+                        help="Per-write delay of the slow deck in multi_deck (default: 20)")
+    parser.add_argument("--pages", type=int, default=1000, help="Pages in the memory benchmark (default: 1000)")
+    args = parser.parse_args(argv)
+    # Debug records would dominate every measurement
+    logging.getLogger().setLevel(logging.WARNING)
+    logger.setLevel(logging.WARNING)
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
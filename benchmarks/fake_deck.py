@@ -0,0 +1,125 @@
+# file: benchmarks/fake_deck.py
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+
+class DeckWrite(NamedTuple):
+    time: float  # time.perf_counter() when the write was made
+    kind: str  # "key" or "touchscreen"
+    key: Optional[int]  # key index for key writes
+    nbytes: int
+    region: Optional[tuple] = None  # (x, y, width, height) for touchscreen writes
+
+
+class FakeStreamDeck:
+    """
+    Stand-in for a StreamDeck device (a Stream Deck+ by default) that needs no hardware.
+    Every image write is recorded with a timestamp; write_delay simulates the USB transfer.
+    """
+    KEY_ROWS = 2
+    KEY_COLS = 4
+    KEY_COUNT = 8
+    DIAL_COUNT = 4
+    KEY_PIXEL_WIDTH = 120
+    KEY_PIXEL_HEIGHT = 120
+    TOUCHSCREEN_PIXEL_WIDTH = 800
+    TOUCHSCREEN_PIXEL_HEIGHT = 100
+
+    def __init__(self, serial: str = "FAKE0001", write_delay: float = 0.0, keep_images: bool = False):
+        self.serial = serial
+        self.write_delay = write_delay
+        self.keep_images = keep_images
+        self.writes: List[DeckWrite] = []
+        # Last image per key (and for the touchscreen) when keep_images is set
+        self.images = {}
+        self.brightness = None
+        self._open = False
+        self.plugged = True
+        self.key_callback: Optional[Callable] = None
+        self.dial_callback: Optional[Callable] = None
+        self.touchscreen_callback: Optional[Callable] = None
+
+    def open(self):
+        self._open = True
+
+    def close(self):
+        self._open = False
+
+    def is_open(self) -> bool:
+        return self._open
+
+    def connected(self) -> bool:
+        return self.plugged
+
+    def id(self) -> str:
+        return f"fake:{self.serial}"
+
+    def unplug(self):
+        """
+        Simulate pulling the cable: the deck is closed and every write fails until plug().
+        """
+        self.plugged = False
+        self._open = False
+
+    def plug(self):
+        self.plugged = True
+
+    def reset(self):
+        self.images.clear()
+
+    def get_serial_number(self) -> str:
+        return self.serial
+
+    def deck_type(self) -> str:
+        return "Fake Stream Deck"
+
+    def set_brightness(self, percent):
+        self.brightness = percent
+
+    def key_image_format(self):
+        return {
+            "size": (self.KEY_PIXEL_WIDTH, self.KEY_PIXEL_HEIGHT),
+            "format": "JPEG",
+            "flip": (False, False),
+            "rotation": 0,
+        }
+
+    def touchscreen_image_format(self):
+        return {
+            "size": (self.TOUCHSCREEN_PIXEL_WIDTH, self.TOUCHSCREEN_PIXEL_HEIGHT),
+            "format": "JPEG",
+            "flip": (False, False),
+            "rotation": 0,
+        }
+
+    def set_key_callback_async(self, callback, loop=None):
+        self.key_callback = callback
+
+    def set_dial_callback_async(self, callback, loop=None):
+        self.dial_callback = callback
+
+    def set_touchscreen_callback_async(self, callback, loop=None):
+        self.touchscreen_callback = callback
+
+    def _write(self, kind: str, key: Optional[int], image, region: Optional[tuple] = None):
+        if not self.plugged:
+            raise OSError("Device not connected")
+        if self.write_delay:
+            time.sleep(self.write_delay)
+        self.writes.append(DeckWrite(time.perf_counter(), kind, key, len(image), region))
+        if self.keep_images:
+            self.images[key if kind == "key" else kind] = bytes(image)
+
+    def set_key_image(self, key, image):
+        if not 0 <= key < self.KEY_COUNT:
+            raise IndexError(f"Invalid key index {key}.")
+        self._write("key", key, image)
+
+    def set_touchscreen_image(self, image, x_pos=0, y_pos=0, width=0, height=0):
+        self._write("touchscreen", None, image, (x_pos, y_pos, width, height))
+
+    def key_writes(self) -> List[DeckWrite]:
+        return [write for write in self.writes if write.kind == "key"]
+
+    def clear_writes(self):
+        self.writes.clear()
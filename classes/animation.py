@@ -0,0 +1,188 @@
+# file: classes/animation.py
+"""
+Precomputed animations: page transitions (slides, fades) and state-change crossfades.
+
+Every intermediate frame of a transition is rendered ahead of time on the render
+pipeline's workers and cached by the frames it goes between, so repeating a
+transition costs nothing but the device writes. Frames are played on a Timeline
+against the monotonic clock: frame n is due at start + n * frame_time, and a
+player that falls behind skips to the frame that is due instead of drifting.
+"""
+import asyncio
+import hashlib
+import inspect
+import io
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple, Union
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+TRANSITIONS = ("fade", "slide_left", "slide_right")
+
+
+class Timeline:
+    """
+    Shows frame indices 0..count-1 on a fixed schedule. The last frame is always shown.
+    """
+    def __init__(self, fps: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.fps = fps
+        self.clock = clock
+        self.played = 0
+        self.dropped = 0
+
+    async def play(self, count: int, show: Callable[[int], Union[None, Awaitable[None]]],
+                   frame_time: Optional[float] = None, cancelled: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Call show(index) for each frame that is shown, waiting for its slot.
+        Returns False if 'cancelled' stopped the timeline early.
+        """
+        frame_time = frame_time or 1.0 / self.fps
+        start = self.clock()
+        shown = -1
+        while shown < count - 1:
+            if cancelled is not None and cancelled():
+                return False
+            index = min(count - 1, int((self.clock() - start) / frame_time))
+            if index <= shown:
+                await asyncio.sleep(start + (shown + 1) * frame_time - self.clock())
+                continue
+            # Frames whose slot has already passed are skipped
+            self.dropped += index - shown - 1
+            shown = index
+            result = show(index)
+            if inspect.isawaitable(result):
+                await result
+            self.played += 1
+        return True
+
+
+def _decode(frame: bytes):
+    from PIL import Image
+
+    with Image.open(io.BytesIO(frame)) as image:
+        return image.convert("RGB")
+
+
+def precompute_transition(kind: str, old_frames: Sequence[bytes], new_frames: Sequence[bytes],
+                          grid: Tuple[int, int], steps: int) -> List[List[bytes]]:
+    """
+    The steps - 1 intermediate frames between two sets of key frames, each a list
+    with one JPEG per key. 'grid' is (rows, cols); slides move the whole grid as
+    one picture. The final frames are the new frames themselves and are not included.
+    Module level so process pools can run it.
+    """
+    from PIL import Image
+
+    from .icon_cache import _encode
+
+    if kind not in TRANSITIONS:
+        raise ValueError(f"Unknown transition {kind!r}")
+    rows, cols = grid
+    old_images = [_decode(frame) for frame in old_frames]
+    new_images = [_decode(frame) for frame in new_frames]
+    width, height = old_images[0].size
+    sequence = []
+    if kind == "fade":
+        for step in range(1, steps):
+            sequence.append([_encode(Image.blend(old, new, step / steps)) for old, new in zip(old_images, new_images)])
+        return sequence
+
+    def canvas(images):
+        picture = Image.new("RGB", (cols * width, rows * height), "black")
+        for index, image in enumerate(images):
+            picture.paste(image, ((index % cols) * width, (index // cols) * height))
+        return picture
+
+    old_canvas, new_canvas = canvas(old_images), canvas(new_images)
+    total = cols * width
+    for step in range(1, steps):
+        shift = total * step // steps
+        picture = Image.new("RGB", old_canvas.size, "black")
+        if kind == "slide_left":  # the new page comes in from the right
+            picture.paste(old_canvas, (-shift, 0))
+            picture.paste(new_canvas, (total - shift, 0))
+        else:
+            picture.paste(old_canvas, (shift, 0))
+            picture.paste(new_canvas, (shift - total, 0))
+        sequence.append([_encode(picture.crop(((index % cols) * width, (index // cols) * height,
+                                               (index % cols + 1) * width, (index // cols + 1) * height)))
+                         for index in range(len(old_images))])
+    return sequence
+
+
+def _digest(frames: Sequence[bytes]) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    for frame in frames:
+        digest.update(hashlib.blake2b(frame, digest_size=16).digest())
+    return digest.digest()
+
+
+class Animator:
+    """
+    Caches precomputed frame sequences (bounded by total bytes) and plays them.
+    """
+    def __init__(self, fps: float = 30.0, max_bytes: int = 8 * 1024 * 1024):
+        self.timeline = Timeline(fps)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._sequences: "OrderedDict[tuple, List[List[bytes]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def steps_for(self, duration: float) -> int:
+        return max(2, round(duration * self.timeline.fps))
+
+    async def sequence(self, kind: str, old_frames: Sequence[bytes], new_frames: Sequence[bytes],
+                       grid: Tuple[int, int], duration: float) -> List[List[bytes]]:
+        steps = self.steps_for(duration)
+        key = (kind, _digest(old_frames), _digest(new_frames), grid, steps)
+        sequence = self._sequences.get(key)
+        if sequence is not None:
+            self._sequences.move_to_end(key)
+            self.hits += 1
+            return sequence
+        self.misses += 1
+        from .render_pipeline import render_pipeline
+
+        loop = asyncio.get_running_loop()
+        # Frames may be memoryviews of an icon atlas, which a process pool cannot pickle
+        sequence = await loop.run_in_executor(render_pipeline.executor, precompute_transition, kind,
+                                              [bytes(frame) for frame in old_frames],
+                                              [bytes(frame) for frame in new_frames], grid, steps)
+        self._sequences[key] = sequence
+        self.total_bytes += sum(len(frame) for frames in sequence for frame in frames)
+        while self.total_bytes > self.max_bytes and len(self._sequences) > 1:
+            _, evicted = self._sequences.popitem(last=False)
+            self.total_bytes -= sum(len(frame) for frames in evicted for frame in frames)
+        return sequence
+
+    async def play(self, sequence: List[List[bytes]], show: Callable[[List[bytes]], Union[None, Awaitable[None]]],
+                   duration: float, cancelled: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Show each step of 'sequence' in its slot of 'duration' seconds. The caller
+        shows the final frames itself once this returns.
+        """
+        if not sequence:
+            return True
+        # One slot per intermediate step plus one for the final frames, which
+        # the timeline only waits for
+        steps = len(sequence)
+        return await self.timeline.play(steps + 1, lambda index: show(sequence[index]) if index < steps else None,
+                                        duration / (steps + 1), cancelled)
+
+    def stats(self) -> dict:
+        return {
+            "sequences": len(self._sequences),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "played": self.timeline.played,
+            "dropped": self.timeline.dropped,
+        }
+
+
+# Shared by every PageManager, so decks showing the same pages share sequences
+animator = Animator()
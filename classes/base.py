@@ -1,35 +1,75 @@
 # file: classes/base.py
-from typing import Optional, Callable, Dict, List, Any
+import inspect
+from typing import Optional, Callable, Dict, List, Any, Tuple
 
-from . import logger
+from tracing import tracer
+from logger import get_logger
 
+logger = get_logger(__name__)
 
-class ItemState:
+
+async def call_action(func: Callable[..., Any], **kwargs) -> Any:
     """
-    Represents one visible/configurable state (image, title) of an InteractableItem.
+    Call an item's callback and await the result if it is awaitable.
+    Callbacks may be coroutine functions or plain callables that return a
+    coroutine (e.g. lambda: manager.go_to_page(page)). Plain synchronous
+    callbacks run inline, so anything slow belongs in functions/ on the action runner.
     """
-    def __init__(self, image: Optional[str] = None, title: Optional[str] = None):
-        self.image = image
-        self.title = title
+    with tracer.span("action", name=getattr(func, "__name__", "action")):
+        result = func(**kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+    return result
 
 
-
-class ItemStates:
+class ItemState:
     """
-    Manages multiple states for a single InteractableItem.
+    Represents one visible/configurable state (image, title, tint) of an InteractableItem.
+    tint is an optional '#rrggbb' colour applied to the (inverted) icon.
+    title_position is where the title is drawn: "top", "middle" or "bottom" (the default).
+    live is an optional LiveTile (see live_tile.py) drawn instead of the image.
+    transition is "fade" to crossfade a key into this state when its button cycles
+    to it; by default the key cuts straight to it in a single write.
+
+    States are interned: equal arguments return the same instance, so e.g. the back
+    button of every sibling page shares one. They are therefore immutable; use replace().
+    Interned states live as long as the process, which is fine for the few distinct
+    states a config has (a weak table would cost more than it saves).
     """
-    def __init__(self, states: Optional[List[ItemState]] = None):
-        self.states: List[ItemState] = states or []
+    __slots__ = ("image", "title", "tint", "live", "title_position", "transition")
+    _interned: Dict[tuple, "ItemState"] = {}
 
+    def __new__(cls, image: Optional[str] = None, title: Optional[str] = None, tint: Optional[str] = None,
+                live=None, title_position: Optional[str] = None, transition: Optional[str] = None):
+        key = (image, title, tint, live, title_position, transition)
+        state = cls._interned.get(key)
+        if state is None:
+            state = object.__new__(cls)
+            for name, value in zip(cls.__slots__, key):
+                object.__setattr__(state, name, value)
+            cls._interned[key] = state
+        return state
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"ItemState is shared and immutable; use replace({name}=...)")
+
+    def replace(self, **changes) -> "ItemState":
+        fields = {name: getattr(self, name) for name in ItemState.__slots__}
+        fields.update(changes)
+        return ItemState(**fields)
+
+    def __repr__(self):
+        return f"ItemState(image={self.image!r}, title={self.title!r})"
 
-    def add_state(self, state: ItemState):
-        self.states.append(state)
 
 class InteractableItem:
     """
     Base class for interactive elements that can cycle states
     and call an async callback when triggered.
     """
+    # Thousands of these exist in a big page tree, so no per-instance __dict__
+    __slots__ = ("super", "position", "current_state_index", "_async_function", "_async_function_input")
+
     def __init__(self,position,page):
         self.super = page
         self.position = position
@@ -52,12 +92,11 @@ class VisibleItem(InteractableItem):
         """
         A base class for items with visible feedback and rendering capabilities.
         """
+        __slots__ = ("states",)
 
         def __init__(self, position, page, item_states: List[ItemState]):
             super().__init__(position, page)
-            self.states = ItemStates()
-            for state in item_states:
-                self.states.add_state(state)
+            self.states: Tuple[ItemState, ...] = tuple(item_states)
 
 
         async def on_trigger(self):
@@ -66,42 +105,58 @@ class VisibleItem(InteractableItem):
             1) Cycle states
             2) Await the assigned async function
             """
-            logger.debug(f"Triggered: {self.title} | State: {self.current_state_index}")
+            logger.debug("Triggered: %s | State: %s", self.title, self.current_state_index)
             await self._cycle_states()
             if self._async_function:
-                if self._async_function_input:
-                    await self._async_function(**self._async_function_input)
-                else:
-                    await self._async_function()
+                await call_action(self._async_function, **(self._async_function_input or {}))
 
         async def _cycle_states(self):
-            if not self.states.states or len(self.states.states) == 1:
+            if len(self.states) <= 1:
                 return
-            logger.debug(f"Cycle states: {self.states}")
-            self.current_state_index = (self.current_state_index + 1) % len(self.states.states)
-            await self.render()
+            logger.debug("Cycle states: %s", self.states)
+            self.current_state_index = (self.current_state_index + 1) % len(self.states)
+            self.request_render()
 
         def render(self):
             raise NotImplementedError("You must implement render() in your subclass.")
 
+        def request_render(self):
+            """
+            Mark this item as needing a redraw. The manager's RenderScheduler
+            draws it on its next tick, together with everything else that changed.
+            """
+            self.super.super.scheduler.mark_dirty(self)
+
+        def _state(self) -> Optional[ItemState]:
+            return self.states[self.current_state_index] if self.states else None
+
+        def _replace_state(self, **changes):
+            # States are shared, so the item gets a changed copy instead of editing it in place
+            states = list(self.states)
+            states[self.current_state_index] = states[self.current_state_index].replace(**changes)
+            self.states = tuple(states)
+
         @property
         def image(self) -> Optional[str]:
-            if not self.states.states:
-                return None
-            return self.states.states[self.current_state_index].image
+            state = self._state()
+            return state.image if state is not None else None
 
         @image.setter
         def image(self, new_image: Optional[str]):
-            if self.states.states:
-                self.states.states[self.current_state_index].image = new_image
+            if self.states:
+                self._replace_state(image=new_image)
+
+        @property
+        def live(self):
+            state = self._state()
+            return state.live if state is not None else None
 
         @property
         def title(self) -> Optional[str]:
-            if not self.states.states:
-                return None
-            return self.states.states[self.current_state_index].title
+            state = self._state()
+            return state.title if state is not None else None
 
         @title.setter
         def title(self, new_title: Optional[str]):
-            if self.states.states:
-                self.states.states[self.current_state_index].title = new_title
\ No newline at end of file
+            if self.states:
+                self._replace_state(title=new_title)
@@ -1,59 +1,74 @@
 # file: classes/button.py
-from typing import List
+from typing import List, Optional
 
-from logger import logger
+from logger import get_logger
 from .base import InteractableItem, ItemState, VisibleItem
+from .icon_cache import tinted
+from .render_pipeline import render_pipeline
+
+logger = get_logger(__name__)
 
 
 class Button(VisibleItem):
     """
     A button that calls 'await on_trigger()' when pressed.
     """
+    __slots__ = ("_state_changed",)
+
     def __init__(self,position: tuple[int,int],page, itemstates: List[ItemState]):
         self.super = page
         super().__init__(position,page,itemstates)
         x,y = position
-        page.buttons[x][y] = self
+        page.add_button(x, y, self)
+        # Set by a state change, so the next render crossfades instead of cutting
+        self._state_changed = False
 
     async def press(self):
         await self.on_trigger()
 
+    async def _cycle_states(self):
+        await super()._cycle_states()
+        # Only states that ask for a crossfade get one; the rest cost a single write
+        self._state_changed = len(self.states) > 1 and self.states[self.current_state_index].transition == "fade"
+
+    def take_state_change(self) -> bool:
+        """
+        True once after a state change: whoever draws the key next crossfades it.
+        """
+        changed, self._state_changed = self._state_changed, False
+        return changed
+
+    async def frame(self) -> Optional[bytes]:
+        """
+        The device-ready image for the current state, or None if there is nothing to show.
+        """
+        if not self.states:
+            return None
+        state = self.states[self.current_state_index]
+        deck = self.super.super.deck
+        size = deck.key_image_format()["size"]
+        if state.live is not None:
+            # Live tiles draw their own labels
+            return await state.live.frame(size)
+        if state.title:
+            return await render_pipeline.render_titled(state.image, size, state.title, state.title_position,
+                                                       tinted(state.tint))
+        if not state.image:
+            return None
+        return await render_pipeline.render_icon(state.image, size, tinted(state.tint))
+
     async def render(self):
         """
-        This reuses your 'set_key_image' logic on a per-(row,col) basis.
+        Draw the current state on this button's key; a state change crossfades.
+        The manager skips the USB write if the key already shows this frame.
         """
-        if not self.states.states[self.current_state_index].image:
+        state_changed = self.take_state_change()
+        final_bytes = await self.frame()
+        if final_bytes is None:
             return
-        else:
-            svg_path = self.states.states[self.current_state_index].image
-        import os, io
-        import cairosvg
-        from PIL import Image, ImageChops
         row, col = self.position
-
-        key_index = row * 4 + col
-        if not os.path.exists(svg_path):
-            logger.error(f"[ERROR] Missing icon: {svg_path}")
-            return
-
-        # Convert SVG -> PNG
-        png_data = cairosvg.svg2png(url=svg_path)
-
-        # Query size
-        key_w, key_h = self.super.super.deck.key_image_format()["size"]
-        with Image.open(io.BytesIO(png_data)).convert("RGBA") as icon:
-            icon = icon.resize((key_w, key_h), Image.LANCZOS)
-
-            # Do your partial invert logic
-            r, g, b, alpha = icon.split()
-            rgb = Image.merge("RGB", (r, g, b))
-            rgb_inverted = ImageChops.invert(rgb)
-            icon_inverted = Image.merge("RGBA", (*rgb_inverted.split(), alpha))
-
-            final_img = Image.new("RGB", (key_w, key_h), color="black")
-            final_img.paste(icon_inverted, mask=icon_inverted.split()[3])
-
-            final_bytes = io.BytesIO()
-            final_img.save(final_bytes, format="JPEG")
-            if self.super is not None:
-                self.super.super.deck.set_key_image(key_index, final_bytes.getvalue())
+        manager = self.super.super
+        if state_changed:
+            manager.animate_key(manager.key_index(row, col), final_bytes)
+        else:
+            manager.push_key_image(manager.key_index(row, col), final_bytes)
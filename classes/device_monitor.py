@@ -0,0 +1,146 @@
+# file: classes/device_monitor.py
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def open_deck(deck) -> str:
+    """
+    Open and reset a deck; returns its serial number. Blocking USB I/O, so run it off the event loop.
+    """
+    deck.open()
+    deck.reset()
+    deck.set_brightness(50)
+    return deck.get_serial_number()
+
+
+def list_decks() -> List[Any]:
+    """
+    Every connected deck (not opened). Imports the StreamDeck USB stack on first use.
+    """
+    from StreamDeck.DeviceManager import DeviceManager
+
+    return DeviceManager().enumerate()
+
+
+def close_deck(deck):
+    try:
+        deck.reset()
+        deck.close()
+    except Exception as e:
+        logger.warning("Could not close deck: %s", e)
+
+
+class DeviceMonitor:
+    """
+    Polls for Stream Decks being plugged in and out.
+
+    A deck that disappears has its PageManager detached: pages keep rendering,
+    but only into the manager's frame store. When a deck with the same serial
+    shows up again, the manager is attached to it and replays its last frames,
+    so the display comes back without re-rendering anything.
+    Decks never seen before are passed to on_new_deck, which returns their
+    PageManager (or None to leave the deck alone until it is plugged in again).
+    """
+    def __init__(self, on_new_deck: Callable[[Any, str], Awaitable[Optional[Any]]],
+                 on_attach: Optional[Callable[[Any, Any], None]] = None,
+                 enumerate_decks: Optional[Callable[[], List[Any]]] = None,
+                 open_deck: Callable[[Any], str] = open_deck, interval: float = 1.0):
+        """
+        :param on_new_deck: async (deck, serial) -> PageManager for a deck seen for the first time.
+        :param on_attach: (deck, manager) called before a known deck is re-attached, e.g. to register callbacks.
+        :param enumerate_decks: returns the connected decks (default: list_decks()).
+        :param open_deck: opens a deck and returns its serial number; runs in a worker thread.
+        :param interval: seconds between polls.
+        """
+        self.on_new_deck = on_new_deck
+        self.on_attach = on_attach
+        self.enumerate_decks = enumerate_decks or list_decks
+        self.open_deck = open_deck
+        self.interval = interval
+        self.managers: Dict[str, Any] = {}  # serial -> PageManager, attached or not
+        self._attached: Dict[str, str] = {}  # device path -> serial
+        # Paths that failed to open or start; retried after they are unplugged
+        self._ignored: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def attached(self) -> List[Any]:
+        return [self.managers[serial] for serial in self._attached.values()]
+
+    async def poll(self):
+        """
+        Compare the connected decks with the known ones once, and act on the difference.
+        """
+        try:
+            decks = await asyncio.to_thread(self.enumerate_decks)
+        except Exception as e:
+            logger.error("Could not enumerate StreamDecks: %s", e)
+            return
+        present = {deck.id(): deck for deck in decks}
+
+        for path, serial in list(self._attached.items()):
+            manager = self.managers[serial]
+            # The library closes a deck whose reads fail, so a closed deck is gone too
+            if path not in present or not manager.deck.is_open():
+                del self._attached[path]
+                manager.detach()
+                logger.warning("StreamDeck %s disconnected", serial)
+
+        self._ignored &= present.keys()
+        arrived = [deck for path, deck in present.items() if path not in self._attached and path not in self._ignored]
+        if arrived:
+            await asyncio.gather(*(self._arrived(deck) for deck in arrived))
+
+    async def _arrived(self, deck):
+        path = deck.id()
+        try:
+            serial = await asyncio.to_thread(self.open_deck, deck)
+        except Exception as e:
+            logger.error("Could not open StreamDeck at %s (unplug and replug it to retry): %s", path, e)
+            self._ignored.add(path)
+            return
+
+        manager = self.managers.get(serial)
+        if manager is not None:
+            if manager.attached:
+                logger.warning("StreamDeck %s is already attached, ignoring %s", serial, path)
+                self._ignored.add(path)
+                return
+            if self.on_attach is not None:
+                self.on_attach(deck, manager)
+            start = time.perf_counter()
+            replayed = await manager.reattach(deck)
+            logger.info("StreamDeck %s reconnected, %s frames replayed in %.1fms", serial, replayed,
+                        (time.perf_counter() - start) * 1e3)
+        else:
+            manager = await self.on_new_deck(deck, serial)
+            if manager is None:
+                self._ignored.add(path)
+                return
+            self.managers[serial] = manager
+        self._attached[path] = serial
+
+    async def run(self):
+        """
+        Poll every 'interval' seconds until cancelled.
+        """
+        while True:
+            await self.poll()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,73 @@
+# file: classes/device_writer.py
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class DeviceWriter:
+    """
+    Runs one deck's USB writes on a thread of its own, in the order they were submitted.
+    A slow or stalled deck then only delays its own frames, never the event loop
+    or the other decks.
+    """
+    def __init__(self, name: str = "deck"):
+        self.name = name
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._last: Optional[Future] = None
+        self.failures = 0
+        # Set while the deck is unplugged: writes are dropped instead of queued
+        self.paused = False
+
+    def submit(self, func: Callable, *args, on_error: Optional[Callable[[Exception], None]] = None) -> Optional[Future]:
+        """
+        Queue func(*args) behind the writes already queued. Errors are logged and
+        passed to on_error, never raised here. on_error runs on the event loop that
+        submitted the write (before drain() returns), so it may touch loop-owned state.
+        Returns None if the writer is paused.
+        """
+        if self.paused:
+            return None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"write-{self.name}")
+        loop = None
+        if on_error is not None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:  # submitted outside a loop: report on the writer thread
+                pass
+        future = self._executor.submit(self._run, func, args, on_error, loop)
+        self._last = future
+        return future
+
+    def _run(self, func: Callable, args: tuple, on_error, loop: Optional[asyncio.AbstractEventLoop]):
+        try:
+            func(*args)
+        except Exception as e:
+            self.failures += 1
+            logger.error("Write to %s failed: %s", self.name, e)
+            if on_error is None:
+                return
+            if loop is None:
+                on_error(e)
+                return
+            try:
+                loop.call_soon_threadsafe(on_error, e)
+            except RuntimeError:  # the loop is closed; nothing is left to correct
+                pass
+
+    async def drain(self):
+        """
+        Wait until every write submitted so far has reached the device.
+        """
+        if self._last is not None and not self._last.done():
+            await asyncio.wrap_future(self._last)
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+            self._last = None
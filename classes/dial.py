@@ -2,21 +2,30 @@
 import asyncio
 from typing import Callable, Optional, Dict, Any, List
 
-from logger import logger
-from .base import InteractableItem, ItemState
+from logger import get_logger
+from .animation import Timeline
+from .base import ItemState, VisibleItem, call_action
 
+logger = get_logger(__name__)
 
-class Dial(InteractableItem):
+
+class Dial(VisibleItem):
     """
     A dial that might be pressed or rotated.
     """
+    __slots__ = ("_rotation_function", "_rotation_input", "_state_animation")
+    state_hold = 0.5  # seconds the current state stays up before the next one
+
     def __init__(self,position: int,page, itemstates: List[ItemState]):
         self.super = page
         super().__init__(position,page, itemstates)
-        self.current_state_index += 1
-        self.super.buttons[position] = self
+        # Rest on the middle state; rotating briefly shows the left/right neighbours
+        if len(self.states) > 1:
+            self.current_state_index = 1
+        self.super.add_dial(position, self)
         self._rotation_function: Optional[Callable[..., Any]] = None
         self._rotation_input: Optional[Dict] = None
+        self._state_animation: Optional[asyncio.Task] = None
 
     def set_rotation_function(self, func: Callable[..., Any], func_input: Optional[Dict] = None):
         self._rotation_function = func
@@ -27,7 +36,7 @@ class Dial(InteractableItem):
         await self.on_trigger()
 
     async def render(self):
-        logger.debug(f"Rendering dial {self.position} with state {self.current_state_index}")
+        logger.debug("Rendering dial %s with state %s", self.position, self.current_state_index)
         pass
 
     async def on_rotate(self, direction: str, step: int = 5):
@@ -42,14 +51,24 @@ class Dial(InteractableItem):
             self.current_state_index -= 1
 
         if self._rotation_function:
-            if self._rotation_input:
-                await self._rotation_function(direction=direction, step=step*5, **self._rotation_input)
-            else:
-                await self._rotation_function(direction=direction, step=step*5)
+            await call_action(self._rotation_function, direction=direction, step=step*5, **(self._rotation_input or {}))
 
 
     async def _cycle_states(self):
-        await self.render()
-        await asyncio.sleep(0.5)
-        self.current_state_index += 1
-        await self.render()
\ No newline at end of file
+        """
+        Show the current state, then the next one state_hold seconds later. Played on
+        a Timeline in the background, so the press action is not held up; a new press
+        restarts it.
+        """
+        if len(self.states) < 2:
+            self.request_render()
+            return
+        if self._state_animation is not None and not self._state_animation.done():
+            self._state_animation.cancel()
+        start = self.current_state_index
+
+        def show(step: int):
+            self.current_state_index = (start + step) % len(self.states)
+            self.request_render()
+
+        self._state_animation = asyncio.create_task(Timeline().play(2, show, frame_time=self.state_hold))
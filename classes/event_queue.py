@@ -0,0 +1,104 @@
+# file: classes/event_queue.py
+import asyncio
+import heapq
+import itertools
+from enum import IntEnum
+from typing import List, Optional, Set, Tuple
+
+from logger import get_logger
+from .events import DialRotate, Event, RenderKey, RenderPage
+
+logger = get_logger(__name__)
+
+
+class Priority(IntEnum):
+    """
+    Lower values are handled first.
+    """
+    NAVIGATION = 0  # presses, taps and swipes; any of them may switch pages
+    ADJUST = 1      # dial rotation
+    RENDER = 2      # cosmetic redraws
+
+
+def priority_of(event: Event) -> Priority:
+    kind = type(event)
+    if kind is RenderPage or kind is RenderKey:
+        return Priority.RENDER
+    if kind is DialRotate:
+        return Priority.ADJUST
+    return Priority.NAVIGATION
+
+
+class EventQueue:
+    """
+    Bounded priority queue between the StreamDeck callbacks and the PageManager.
+    Events of equal priority keep their arrival order. Render requests are
+    coalesced: a request that is already pending (or covered by a pending
+    RenderPage) is dropped, since the render draws whatever the state is when it runs.
+    """
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._heap: List[Tuple[int, int, Event, Optional[asyncio.Future]]] = []
+        self._seq = itertools.count()
+        self._pending_renders: Set[Event] = set()
+        self._not_empty = asyncio.Event()
+        self.coalesced = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def put(self, event: Event, done: Optional[asyncio.Future] = None) -> bool:
+        """
+        Enqueue an event without blocking. Returns False if it was dropped because
+        the queue is full of events at least as important.
+        'done', if given, is resolved once the event has been handled.
+        """
+        priority = priority_of(event)
+        if priority is Priority.RENDER:
+            if event in self._pending_renders or RenderPage() in self._pending_renders:
+                self.coalesced += 1
+                self._resolve(done)
+                return True
+
+        if len(self._heap) >= self.maxsize and not self._evict_below(priority):
+            self.dropped += 1
+            logger.warning("Event queue full, dropping %s", event)
+            self._resolve(done)
+            return False
+
+        heapq.heappush(self._heap, (priority, next(self._seq), event, done))
+        if priority is Priority.RENDER:
+            self._pending_renders.add(event)
+        self._not_empty.set()
+        return True
+
+    def _evict_below(self, priority: Priority) -> bool:
+        """
+        Make room by dropping the newest of the least important queued events,
+        if it is less important than 'priority'.
+        """
+        victim = max(range(len(self._heap)), key=lambda i: self._heap[i][:2])
+        victim_priority, _, event, done = self._heap[victim]
+        if victim_priority <= priority:
+            return False
+        self._heap[victim] = self._heap[-1]
+        self._heap.pop()
+        heapq.heapify(self._heap)
+        self._pending_renders.discard(event)
+        self.dropped += 1
+        self._resolve(done)
+        return True
+
+    @staticmethod
+    def _resolve(done: Optional[asyncio.Future]):
+        if done is not None and not done.done():
+            done.set_result(None)
+
+    async def get(self) -> Tuple[Event, Optional[asyncio.Future]]:
+        while not self._heap:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        _, _, event, done = heapq.heappop(self._heap)
+        self._pending_renders.discard(event)
+        return event, done
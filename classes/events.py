@@ -0,0 +1,62 @@
+# file: classes/events.py
+from typing import NamedTuple, Tuple, Union
+
+
+class ButtonPress(NamedTuple):
+    row: int
+    col: int
+
+
+class DialPress(NamedTuple):
+    dial: int
+
+
+class DialRotate(NamedTuple):
+    dial: int
+    direction: str  # "left" or "right"
+    steps: int
+
+
+class LedSwipe(NamedTuple):
+    direction: str
+
+
+class LedTap(NamedTuple):
+    x: int
+    y: int
+
+
+class RenderPage(NamedTuple):
+    """
+    Redraw every key of the current page.
+    """
+
+
+class RenderKey(NamedTuple):
+    """
+    Redraw one key of the current page.
+    """
+    row: int
+    col: int
+
+
+Event = Union[ButtonPress, DialPress, DialRotate, LedSwipe, LedTap, RenderPage, RenderKey]
+
+# The original string-tagged tuples, e.g. ("button_press", row, col)
+_LEGACY_KINDS = {
+    "button_press": ButtonPress,
+    "dial_press": DialPress,
+    "dial_rotate": DialRotate,
+    "led_swipe": LedSwipe,
+    "led_tap": LedTap,
+}
+
+
+def from_tuple(event: Tuple) -> Event:
+    """
+    Convert a legacy ("kind", *args) tuple into its typed event.
+    """
+    kind = _LEGACY_KINDS.get(event[0])
+    if kind is None:
+        raise ValueError(f"Unknown event: {event!r}")
+    return kind(*event[1:])
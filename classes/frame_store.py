@@ -0,0 +1,108 @@
+# file: classes/frame_store.py
+"""
+The frames of the first page shown, persisted between runs.
+
+At startup the icon cache is seeded from this file, so the root page renders
+from cache hits alone: no SVG is rasterized and neither cairosvg nor PIL is
+imported until something missing from the file is drawn. Entries keep their
+icon cache keys (file, content digest, key size, transform, title...). A changed
+title or tint in the config is a different key and just misses; an icon edited
+on disk is caught when loading, where every entry's digest is checked against
+the icon catalog (which re-hashes files whose mtime or size changed).
+"""
+import json
+import os
+import struct
+from typing import Dict, Optional
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# File layout: header (magic, index length), JSON index [[key, frame length], ...],
+# then the frames back to back
+FRAME_STORE_MAGIC = b"SDFRAMES1"
+_HEADER = struct.Struct("<9sI")
+
+DEFAULT_FRAME_STORE_PATH = os.path.join(".cache", "first-frames.bin")
+
+
+def _key(value):
+    # JSON turns the key tuples (and the sizes inside them) into lists
+    return tuple(_key(item) for item in value) if isinstance(value, list) else value
+
+
+def _current(cache, key: tuple) -> bool:
+    """
+    Whether the icon a stored frame was drawn from still has the digest in its key.
+    Keys start with either ("blank", size) or an icon key (path, digest, size, transform).
+    """
+    if key[0] == "blank":
+        return True
+    path, _, size, transform = key[:4]
+    return cache.key_for(path, size, transform) == key[:4]
+
+
+class FrameStore:
+    """
+    Reads and writes one file of icon cache entries. path=None disables it.
+    """
+    def __init__(self, path: Optional[str] = DEFAULT_FRAME_STORE_PATH):
+        self.path = path
+
+    def read(self) -> Dict[tuple, bytes]:
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+            magic, index_length = _HEADER.unpack_from(data, 0)
+            if magic != FRAME_STORE_MAGIC:
+                raise ValueError("not a frame store")
+            offset = _HEADER.size + index_length
+            frames = {}
+            for key, length in json.loads(data[_HEADER.size:offset]):
+                frames[_key(key)] = data[offset:offset + length]
+                offset += length
+            return frames
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning("Ignoring frame store %s: %s", self.path, e)
+            return {}
+
+    def load(self, cache) -> Dict[tuple, bytes]:
+        """
+        Put every stored frame whose icon is unchanged into 'cache' (an IconCache)
+        and return them.
+        """
+        stored = self.read()
+        frames = {key: frame for key, frame in stored.items() if _current(cache, key)}
+        for key, frame in frames.items():
+            cache.put(key, frame)
+        if stored:
+            logger.debug("Loaded %s frames from %s (%s stale)", len(frames), self.path, len(stored) - len(frames))
+        return frames
+
+    def save(self, frames: Dict[tuple, bytes]) -> int:
+        """
+        Replace the file with 'frames'; returns the number written.
+        """
+        if not self.path:
+            return 0
+        index = json.dumps([[list(key), len(frame)] for key, frame in frames.items()],
+                           separators=(",", ":")).encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_HEADER.pack(FRAME_STORE_MAGIC, len(index)))
+                f.write(index)
+                for frame in frames.values():
+                    f.write(frame)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not write frame store %s: %s", self.path, e)
+            return 0
+        logger.debug("Saved %s frames to %s", len(frames), self.path)
+        return len(frames)
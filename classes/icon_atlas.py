@@ -0,0 +1,154 @@
+# file: classes/icon_atlas.py
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from logger import get_logger
+from .icon_cache import INVERT, rasterize_icon
+from .icon_catalog import _digest
+
+logger = get_logger(__name__)
+
+# File layout (all integers little-endian):
+#   header:  magic, tile width, tile height, tile count, transform name
+#   index:   per tile -> name length, name (utf-8), content digest of the SVG
+#            (as in the icon catalog), data offset, data length
+#   data:    the device-ready JPEG tiles, back to back
+ATLAS_MAGIC = b"SDATLAS2"
+_HEADER = struct.Struct("<8sHHI16s")
+_NAME_LEN = struct.Struct("<H")
+_ENTRY = struct.Struct("<16sQI")
+
+DEFAULT_ATLAS_DIR = "atlas"
+
+
+def atlas_path_for(size: Tuple[int, int], transform: str = INVERT, directory: str = DEFAULT_ATLAS_DIR) -> str:
+    """
+    Where the atlas for one key format lives, e.g. atlas/icons-120x120-invert.atlas.
+    """
+    key_w, key_h = size
+    return os.path.join(directory, f"icons-{key_w}x{key_h}-{transform}.atlas")
+
+
+def _render_tile(args):
+    svg_path, size, transform = args
+    try:
+        # Hashed first, so an edit while rendering leaves a tile that never matches
+        digest = _digest(svg_path)
+        return svg_path, digest, rasterize_icon(svg_path, size, transform)
+    except Exception as e:
+        logger.error("Failed to rasterize %s: %s", svg_path, e)
+        return svg_path, None, None
+
+
+def compile_atlas(svg_paths: Iterable[str], size: Tuple[int, int], out_path: str,
+                  transform: str = INVERT, workers: Optional[int] = None) -> int:
+    """
+    Pre-render every SVG in svg_paths at the given key size and pack the tiles
+    into a single atlas file. Returns the number of tiles written.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    names = sorted({os.path.normpath(path) for path in svg_paths})
+    jobs = [(name, tuple(size), transform) for name in names]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        tiles = [(name, digest, data) for name, digest, data in pool.map(_render_tile, jobs, chunksize=32)
+                 if data is not None]
+
+    encoded_names = [name.encode("utf-8") for name, _, _ in tiles]
+    index_size = sum(_NAME_LEN.size + len(name) + _ENTRY.size for name in encoded_names)
+    offset = _HEADER.size + index_size
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(ATLAS_MAGIC, size[0], size[1], len(tiles), transform.encode("ascii")))
+        for name, (_, digest, data) in zip(encoded_names, tiles):
+            f.write(_NAME_LEN.pack(len(name)))
+            f.write(name)
+            f.write(_ENTRY.pack(bytes.fromhex(digest), offset, len(data)))
+            offset += len(data)
+        for _, _, data in tiles:
+            f.write(data)
+    # Swap the finished file in atomically so a running deck never maps half an atlas
+    os.replace(tmp_path, out_path)
+    logger.info("Wrote %s tiles at %sx%s to %s", len(tiles), size[0], size[1], out_path)
+    return len(tiles)
+
+
+class IconAtlas:
+    """
+    Read-only, memory-mapped view of an atlas written by compile_atlas().
+    Tiles are returned as memoryview slices of the mapping, which can be passed
+    straight to deck.set_key_image() without copying or touching any SVG. Each
+    tile remembers the content digest of the SVG it was rendered from, so an
+    icon edited after compiling is not served from the atlas.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        magic, key_w, key_h, count, transform = _HEADER.unpack_from(self._map, 0)
+        if magic != ATLAS_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an icon atlas (or needs recompiling with compile_icons.py)")
+        self.size: Tuple[int, int] = (key_w, key_h)
+        self.transform: str = transform.rstrip(b"\0").decode("ascii")
+
+        self._index: Dict[str, Tuple[str, int, int]] = {}  # name -> (digest, offset, length)
+        pos = _HEADER.size
+        for _ in range(count):
+            (name_len,) = _NAME_LEN.unpack_from(self._map, pos)
+            pos += _NAME_LEN.size
+            name = bytes(self._map[pos:pos + name_len]).decode("utf-8")
+            pos += name_len
+            digest, offset, length = _ENTRY.unpack_from(self._map, pos)
+            self._index[name] = (digest.hex(), offset, length)
+            pos += _ENTRY.size
+
+    def get(self, svg_path: str, digest: str) -> Optional[memoryview]:
+        """
+        The tile for an icon, or None unless it was rendered from a file with this content digest.
+        """
+        entry = self._index.get(svg_path)
+        if entry is None:
+            entry = self._index.get(os.path.normpath(svg_path))
+        if entry is None or entry[0] != digest:
+            return None
+        _, offset, length = entry
+        return self._view[offset:offset + length]
+
+    def names(self) -> List[str]:
+        return list(self._index)
+
+    def close(self):
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # Tiles still held (e.g. a key's last frame) keep the mapping alive until they are dropped
+            logger.debug("Icon atlas %s still has tiles in use", self.path)
+        self._file.close()
+
+    def __contains__(self, svg_path: str) -> bool:
+        return svg_path in self._index or os.path.normpath(svg_path) in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+
+def load_atlas(size: Tuple[int, int], transform: str = INVERT, directory: str = DEFAULT_ATLAS_DIR) -> Optional[IconAtlas]:
+    """
+    Open the atlas for a key format if one has been compiled, otherwise return None.
+    """
+    path = atlas_path_for(size, transform, directory)
+    if not os.path.exists(path):
+        return None
+    try:
+        return IconAtlas(path)
+    except (OSError, ValueError, struct.error) as e:
+        logger.error("Could not load icon atlas %s: %s", path, e)
+        return None
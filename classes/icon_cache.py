@@ -0,0 +1,222 @@
+# file: classes/icon_cache.py
+import io
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from logger import get_logger
+from tracing import tracer
+from .icon_catalog import IconCatalog, icon_catalog
+
+logger = get_logger(__name__)
+
+# The base transform: invert the RGB channels and flatten the icon onto a
+# black background using its alpha channel. A '#rrggbb' suffix additionally
+# tints the inverted colours, e.g. "invert#ff0000".
+INVERT = "invert"
+
+
+def tinted(tint: Optional[str] = None) -> str:
+    """
+    The transform name for an (optionally tinted) inverted icon.
+    """
+    return INVERT + tint if tint else INVERT
+
+
+def _transform_tint(transform: str):
+    from .icon_transform import parse_tint
+
+    if not transform.startswith(INVERT):
+        raise ValueError(f"Unknown icon transform: {transform}")
+    return parse_tint(transform[len(INVERT):])
+
+
+def _load_icon(svg_path: str, size: Tuple[int, int]):
+    import cairosvg
+    from PIL import Image
+
+    # Convert SVG -> PNG, then scale to the key size
+    with tracer.span("rasterize", icon=svg_path):
+        png_data = cairosvg.svg2png(url=svg_path)
+        with Image.open(io.BytesIO(png_data)) as icon:
+            return icon.convert("RGBA").resize(tuple(size), Image.LANCZOS)
+
+
+def _encode(final_img) -> bytes:
+    with tracer.span("encode"):
+        final_bytes = io.BytesIO()
+        final_img.save(final_bytes, format="JPEG")
+        return final_bytes.getvalue()
+
+
+def rasterize_icon(svg_path: str, size: Tuple[int, int], transform: str = INVERT) -> bytes:
+    """
+    Runs the full SVG -> PNG -> resize -> transform -> JPEG chain and returns
+    the device-ready bytes for a key of the given size.
+    """
+    from .icon_transform import invert_over_black
+
+    tint = _transform_tint(transform)
+    return _encode(invert_over_black(_load_icon(svg_path, size), tint))
+
+
+def rasterize_icon_batch(items: List[Tuple[str, str]], size: Tuple[int, int]) -> List[Union[bytes, Exception]]:
+    """
+    rasterize_icon() for many (svg path, transform) pairs of one key size, as one
+    pool job. Each icon is transformed on its own: its pixels stay in the CPU
+    caches, where one pass over a whole page of icons did not and was slower.
+    Failures are returned in place as the exception instead of failing the batch.
+    """
+    results: List[Union[bytes, Exception]] = []
+    for svg_path, transform in items:
+        try:
+            results.append(rasterize_icon(svg_path, size, transform))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+class IconCache:
+    """
+    Bounded LRU of rasterized icons, holding the final JPEG bytes that are
+    handed to deck.set_key_image().
+    Entries are keyed by (svg path, content hash, key size, transform). The hash
+    comes from the IconCatalog, so resolving an icon never stats the file; icons
+    outside the catalog fall back to the file's mtime.
+    The cache is bounded both by entry count and by total frame bytes.
+    """
+    def __init__(self, max_entries: int = 512, max_bytes: int = 16 * 1024 * 1024,
+                 catalog: Optional[IconCatalog] = icon_catalog):
+        self.catalog = catalog
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.atlas_hits = 0
+        # Pre-compiled tile atlases, keyed by (key size, transform)
+        self._atlases: Dict[Tuple[Tuple[int, int], str], Any] = {}
+        # Keys used while recording (see start_recording())
+        self._recorded: Optional[Set[tuple]] = None
+
+    def attach_atlas(self, atlas):
+        """
+        Serve icons from a pre-compiled IconAtlas before falling back to rasterizing.
+        An atlas already attached for the same key format is closed.
+        """
+        previous = self._atlases.get((tuple(atlas.size), atlas.transform))
+        self._atlases[(tuple(atlas.size), atlas.transform)] = atlas
+        if previous is not None and previous is not atlas:
+            previous.close()
+        logger.info("Using icon atlas %s (%s tiles)", atlas.path, len(atlas))
+
+    def has_atlas(self, size: Tuple[int, int], transform: str = INVERT) -> bool:
+        return (tuple(size), transform) in self._atlases
+
+    def detach_atlases(self):
+        for atlas in self._atlases.values():
+            atlas.close()
+        self._atlases.clear()
+
+    def key_for(self, svg_path: str, size: Tuple[int, int], transform: str = INVERT) -> Optional[tuple]:
+        """
+        Build the cache key for an icon, or None if the file does not exist.
+        svg_path may also be an icon id or alias; key[0] is always the file to rasterize.
+        """
+        entry = self.catalog.resolve(svg_path) if self.catalog is not None else None
+        if entry is not None:
+            return entry.path, entry.digest, tuple(size), transform
+        try:
+            mtime = os.stat(svg_path).st_mtime_ns
+        except OSError:
+            return None
+        return svg_path, mtime, tuple(size), transform
+
+    def start_recording(self):
+        """
+        Remember every key looked up or stored from now on, e.g. to persist what the first page needed.
+        """
+        self._recorded = set()
+
+    def stop_recording(self) -> Dict[tuple, bytes]:
+        """
+        The cached frames of every key used since start_recording().
+        """
+        keys, self._recorded = self._recorded or set(), None
+        return {key: self._entries[key] for key in keys if key in self._entries}
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        if self._recorded is not None:
+            self._recorded.add(key)
+        frame = self._entries.get(key)
+        if frame is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return frame
+
+    def put(self, key: tuple, frame: bytes):
+        if self._recorded is not None:
+            self._recorded.add(key)
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.total_bytes -= len(previous)
+        self._entries[key] = frame
+        self.total_bytes += len(frame)
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= len(evicted)
+
+    def lookup(self, svg_path: str, size: Tuple[int, int], transform: str = INVERT) -> Tuple[Optional[bytes], Optional[tuple]]:
+        """
+        Return (frame, key) for an icon without rasterizing anything.
+        frame is None on a miss; key is None when the icon file does not exist.
+        Icons found in an attached atlas are returned as slices of the mapped file.
+        """
+        key = self.key_for(svg_path, size, transform)
+        if key is None:
+            logger.error("Missing icon: %s", svg_path)
+            return None, None
+        atlas = self._atlases.get((tuple(size), transform))
+        if atlas is not None:
+            # A tile of an icon edited since compiling has another digest and is a miss
+            tile = atlas.get(key[0], key[1])
+            if tile is not None:
+                self.atlas_hits += 1
+                return tile, key
+        return self.get(key), key
+
+    def render(self, svg_path: str, size: Tuple[int, int], transform: str = INVERT) -> Optional[bytes]:
+        """
+        Return the device-ready frame for an icon, rasterizing it only on a cache miss.
+        This runs on the caller's thread; async code should use render_pipeline instead.
+        """
+        frame, key = self.lookup(svg_path, size, transform)
+        if frame is None and key is not None:
+            frame = rasterize_icon(key[0], size, transform)
+            self.put(key, frame)
+        return frame
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "atlas_hits": self.atlas_hits,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Shared by every render path (buttons, the page manager and main.py).
+icon_cache = IconCache()
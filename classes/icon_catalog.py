@@ -0,0 +1,226 @@
+# file: classes/icon_catalog.py
+"""
+Index of the Icons/ directory: icon ids (the file name without .svg), aliases
+and content hashes, cached on disk so startup does not hash ~7,400 files.
+
+    python -m classes.icon_catalog volume      # prefix and fuzzy search
+"""
+import bisect
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_ICON_DIR = "Icons"
+DEFAULT_CATALOG_PATH = os.path.join(".cache", "icon-catalog.json")
+# Optional {"alias": "icon-id"} file inside the icon directory
+ALIASES_FILE = "aliases.json"
+CATALOG_VERSION = 1
+
+
+class IconEntry(NamedTuple):
+    name: str  # icon id, e.g. "volume-high"
+    path: str  # e.g. "Icons/volume-high.svg"
+    digest: str  # blake2b of the file contents
+    mtime_ns: int
+    size: int
+
+
+def _digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+class IconCatalog:
+    """
+    Resolves icon references to files without touching the filesystem.
+    A reference can be an icon id ("volume-high"), an alias, "volume-high.svg"
+    or a path inside the icon directory ("Icons/volume-high.svg").
+    The index is loaded (or built) on first use; call refresh() after changing icons
+    on disk while running.
+    """
+    def __init__(self, directory: str = DEFAULT_ICON_DIR, cache_path: Optional[str] = DEFAULT_CATALOG_PATH):
+        self.directory = directory
+        self.cache_path = cache_path
+        self._entries: Dict[str, IconEntry] = {}
+        self._aliases: Dict[str, str] = {}
+        self._names: List[str] = []  # sorted, for prefix search
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def load(self):
+        """
+        Start from the on-disk index, checked file by file against the directory.
+        An icon edited in place leaves the directory's mtime alone, so that alone
+        cannot tell whether the stored hashes still hold.
+        """
+        self.refresh(self._read_cache())
+
+    def refresh(self, cached: Optional[dict] = None):
+        """
+        Rescan the icon directory (one scandir). Files whose size and mtime match
+        the previous index keep their hash; only new or changed files are read.
+        """
+        self._loaded = True
+        if cached is None:
+            cached = self._read_cache()
+        # Cached entries stay plain lists until they are known to be current
+        previous = {entry[0]: entry for entry in cached["entries"]} if cached else self._entries
+        entries = []
+        try:
+            scan = list(os.scandir(self.directory))
+        except OSError as e:
+            logger.error("Cannot read icon directory %s: %s", self.directory, e)
+            scan = []
+        hashed = 0
+        for dir_entry in scan:
+            if not dir_entry.name.endswith(".svg") or not dir_entry.is_file():
+                continue
+            name = dir_entry.name[:-len(".svg")]
+            stat = dir_entry.stat()
+            old = previous.get(name)
+            if old is not None and old[3] == stat.st_mtime_ns and old[4] == stat.st_size:
+                entries.append(IconEntry._make(old))
+                continue
+            # Store paths the way configs write them, e.g. "Icons/cog.svg"
+            path = f"{self.directory}/{dir_entry.name}"
+            entries.append(IconEntry(name, path, _digest(dir_entry.path), stat.st_mtime_ns, stat.st_size))
+            hashed += 1
+        self._set_entries(entries)
+        self._load_aliases()
+        if hashed or len(entries) != len(previous):
+            logger.info("Indexed %s icons in %s (%s hashed)", len(self._entries), self.directory, hashed)
+            self._write_cache()
+
+    def _set_entries(self, entries: Iterable[IconEntry]):
+        self._entries = {entry.name: entry for entry in entries}
+        self._names = sorted(self._entries)
+
+    def _load_aliases(self):
+        self._aliases = {}
+        path = os.path.join(self.directory, ALIASES_FILE)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                aliases = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("Ignoring icon aliases in %s: %s", path, e)
+            return
+        for alias, name in aliases.items():
+            self.add_alias(alias, name)
+
+    def _read_cache(self) -> Optional[dict]:
+        if not self.cache_path:
+            return None
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get("version") != CATALOG_VERSION or cached.get("directory") != self.directory:
+            return None
+        return cached
+
+    def _write_cache(self):
+        if not self.cache_path:
+            return
+        data = {
+            "version": CATALOG_VERSION,
+            "directory": self.directory,
+            "entries": [list(self._entries[name]) for name in self._names],
+        }
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning("Could not write icon catalog %s: %s", self.cache_path, e)
+
+    def add_alias(self, alias: str, name: str):
+        self._ensure_loaded()
+        if name not in self._entries:
+            logger.warning("Icon alias %r points at unknown icon %r", alias, name)
+            return
+        self._aliases[alias] = name
+
+    def resolve(self, reference: str) -> Optional[IconEntry]:
+        """
+        The entry for an icon id, alias, file name or path, or None if there is no such icon.
+        """
+        self._ensure_loaded()
+        entry = self._entries.get(reference)
+        if entry is not None:
+            return entry
+        name = self._aliases.get(reference)
+        if name is None:
+            directory, _, name = reference.rpartition("/")
+            if directory not in ("", self.directory) or not name.endswith(".svg"):
+                return None
+            name = name[:-len(".svg")]
+        return self._entries.get(name)
+
+    def __contains__(self, reference: str) -> bool:
+        return self.resolve(reference) is not None
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._entries)
+
+    def search_prefix(self, prefix: str, limit: int = 20) -> List[str]:
+        """
+        Icon ids starting with 'prefix', in alphabetical order.
+        """
+        self._ensure_loaded()
+        start = bisect.bisect_left(self._names, prefix)
+        matches = []
+        for name in self._names[start:start + limit]:
+            if not name.startswith(prefix):
+                break
+            matches.append(name)
+        return matches
+
+    def search_fuzzy(self, query: str, limit: int = 10, cutoff: float = 0.6) -> List[str]:
+        """
+        Icon ids and aliases that look like 'query', best match first.
+        """
+        import difflib
+
+        self._ensure_loaded()
+        return difflib.get_close_matches(query, [*self._names, *self._aliases], n=limit, cutoff=cutoff)
+
+    def missing(self, references: Iterable[str]) -> List[str]:
+        """
+        The references that do not name any icon.
+        """
+        return sorted({reference for reference in references if self.resolve(reference) is None})
+
+    def suggest(self, reference: str) -> List[str]:
+        """
+        Likely intended icons for a reference that did not resolve.
+        """
+        name = reference.rpartition("/")[2]
+        if name.endswith(".svg"):
+            name = name[:-len(".svg")]
+        return self.search_fuzzy(name, limit=3)
+
+
+# Shared by the icon cache and config validation
+icon_catalog = IconCatalog()
+
+
+if __name__ == "__main__":
+    for query in sys.argv[1:]:
+        print(f"{query}:")
+        for name in dict.fromkeys(icon_catalog.search_prefix(query) + icon_catalog.search_fuzzy(query)):
+            print(f"  {name}")
@@ -1,26 +1,38 @@
 # file: classes/led.py
-import io
-from typing import Callable, Optional, Dict, Any, List, Tuple
+from typing import Callable, Optional, Dict, Any, List, Sequence, Tuple
 
-from PIL import Image
-
-from logger import logger
-from .base import InteractableItem, ItemState, VisibleItem
+from logger import get_logger
+from .base import ItemState, VisibleItem, call_action
+from .strip_compositor import StripUpdate
 from .touchbutton import TouchButton
 
+logger = get_logger(__name__)
+
+TOUCH_BUTTON_COUNT = 4
+
 
 class Led(VisibleItem):
     """
     Represents the LED screen as a 4x1 grid with dynamic TouchButton regions.
+    The pixels live in the manager's StripCompositor, which only sends the regions that changed.
     """
-    def __init__(self, page, dimensions: Tuple[int, int]):
+    __slots__ = ("_swipe_input", "_swipe_function", "dimensions", "touch_buttons")
+
+    def __init__(self, page, dimensions: Optional[Tuple[int, int]] = None):
         self._swipe_input = None
         self._swipe_function = None
         self.super = page
         super().__init__((0, 0), page, [])
-        self.dimensions = dimensions
-        self.image = Image.new("RGBA", self.dimensions, "black")  # Create a blank LED image
-        self.touch_buttons: List[Optional[TouchButton]] = [None] * 4  # 4x1 grid
+        deck = page.super.deck
+        self.dimensions = dimensions or (deck.TOUCHSCREEN_PIXEL_WIDTH, deck.TOUCHSCREEN_PIXEL_HEIGHT)
+        self.touch_buttons: List[Optional[TouchButton]] = [None] * TOUCH_BUTTON_COUNT  # 4x1 grid
+        # Taps and swipes on the strip go to the page's first LED
+        if page.led is None:
+            page.led = self
+
+    @property
+    def button_width(self) -> int:
+        return self.dimensions[0] // len(self.touch_buttons)
 
     def add_touch_button(self, index: int, item_states: List[ItemState], tap_function: Callable[..., Any]):
         """
@@ -30,35 +42,45 @@ class Led(VisibleItem):
         :param tap_function: The function to call when the button is tapped.
         """
         if not (0 <= index < len(self.touch_buttons)):
-            logger.error(f"Index {index} out of bounds for LED touch buttons.")
+            logger.error("Index %s out of bounds for LED touch buttons.", index)
             return
         if self.touch_buttons[index] is not None:
-            logger.error(f"TouchButton already exists at index {index}")
+            logger.error("TouchButton already exists at index %s", index)
             return
 
         # Calculate position of the TouchButton within the LED
-        button_width = self.dimensions[0] // 4
-        button_position = (index * button_width, 0)
+        button_position = (index * self.button_width, 0)
 
-        button = TouchButton(position=button_position, size=(button_width, self.dimensions[1]), page=self.super, item_states=item_states)
+        button = TouchButton(self, button_position, (self.button_width, self.dimensions[1]), self.super, item_states)
         button.set_tap_function(tap_function)
         self.touch_buttons[index] = button
+        return button
 
-    async def render(self):
+    def updates(self) -> List[StripUpdate]:
         """
-        Combine all TouchButton images into the LED display.
+        What the strip compositor should show in every region of the LED; empty regions are blank.
         """
-        from PIL import Image
-
-        led_image = Image.new("RGBA", self.dimensions, "black")
-        for idx, button in enumerate(self.touch_buttons):
-            if button:
-                await button.render()
+        updates = []
+        for index, button in enumerate(self.touch_buttons):
+            if button is not None:
+                updates.append(button.update())
+            else:
+                region = (index * self.button_width, 0, self.button_width, self.dimensions[1])
+                updates.append(StripUpdate(region, None))
+        return updates
 
-        # Render the final image to the LED
-        led_image_bytes = io.BytesIO()
-        led_image.save(led_image_bytes, format="JPEG")
-        self.super.super.deck.set_led_image(led_image_bytes.getvalue())
+    async def render(self, buttons: Optional[Sequence[TouchButton]] = None):
+        """
+        Bring the touchscreen up to date with 'buttons' (default: the whole LED).
+        Regions already showing the right tile are not re-sent.
+        """
+        compositor = self.super.super.strip_compositor
+        if compositor is None:
+            logger.debug("Deck has no touchscreen, not rendering LED")
+            return
+        updates = self.updates() if buttons is None else [button.update() for button in buttons]
+        written = await compositor.compose(updates)
+        logger.debug("Rendered LED on %s (%s/%s regions changed)", self.super.name, written, len(updates))
 
     async def on_tap(self, x=None, y=None):
         """
@@ -69,15 +91,14 @@ class Led(VisibleItem):
             return
 
         # Determine which button in the 4x1 grid was tapped
-        button_width = self.dimensions[0] // 4
-        button_index = x // button_width
+        button_index = x // self.button_width
 
         if 0 <= button_index < len(self.touch_buttons):
             button = self.touch_buttons[button_index]
             if button:
-                await button.on_tap()
+                await button.on_tap(x, y)
             else:
-                logger.warning(f"No button defined at index {button_index}")
+                logger.warning("No button defined at index %s", button_index)
 
     def set_swipe_function(self, func: Callable[..., Any], func_input: Optional[Dict] = None):
         self._swipe_function = func
@@ -88,7 +109,4 @@ class Led(VisibleItem):
         # await self.on_trigger()
 
         if self._swipe_function:
-            if self._swipe_input:
-                await self._swipe_function(direction=direction, **self._swipe_input)
-            else:
-                await self._swipe_function(direction=direction)
\ No newline at end of file
+            await call_action(self._swipe_function, direction=direction, **(self._swipe_input or {}))
@@ -1,11 +1,13 @@
 # file: classes/lcd_dial.py
 from typing import List, Callable, Tuple, Any
 
-from logger import logger
+from logger import get_logger
 from .base import ItemState
 from .dial import Dial
 from .led import Led
 
+logger = get_logger(__name__)
+
 class LCDDial:
     """
     Combines a Dial with a 4x1 Led for interactive control and display.
@@ -40,16 +42,16 @@ class LCDDial:
             self.current_led_screen = max(0, self.current_led_screen - step)
         elif direction == "right":
             self.current_led_screen = min(len(self.led.touch_buttons) - 1, self.current_led_screen + step)
-        logger.info(f"LCDDial {self.dial.position}: Changed to screen {self.current_led_screen}")
-        await self.led.render()
+        logger.info("LCDDial %s: Changed to screen %s", self.dial.position, self.current_led_screen)
+        self.led.request_render()
 
     async def handle_tap(self, x=None, y=None):
-        logger.info(f"Tapped on LCDDial {self.dial.position} at {x},{y}")
+        logger.info("Tapped on LCDDial %s at %s,%s", self.dial.position, x, y)
         # Handle tap logic specific to this LED screen
         await self.led.on_tap(x, y)
 
     async def handle_swipe(self, direction: str):
-        logger.info(f"Swiped {direction} on LCDDial {self.dial.position}")
+        logger.info("Swiped %s on LCDDial %s", direction, self.dial.position)
         # Handle swipe logic (e.g., cycling screens or invoking actions)
         await self.led.on_swipe(direction)
 
@@ -0,0 +1,214 @@
+# file: classes/live_tile.py
+"""
+Live tiles: key images drawn from a changing value (a clock, CPU load, the volume).
+
+A LiveTile either polls a source every 'interval' seconds or subscribes to one
+that pushes new values. One shared LiveTileScheduler only watches tiles on the
+page each deck is showing; a tile on a hidden page is neither polled nor drawn.
+A tile is redrawn when its value changes, and each frame is cached per key size
+until the next change.
+"""
+import asyncio
+import heapq
+import inspect
+import io
+import itertools
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+_UNSET = object()
+
+
+def _encode(image) -> bytes:
+    encoded = io.BytesIO()
+    image.convert("RGB").save(encoded, format="JPEG")
+    return encoded.getvalue()
+
+
+class LiveTile:
+    """
+    :param name: Shown in logs.
+    :param render: render(value, size) -> PIL image, or an icon reference drawn through the icon cache.
+        Runs in a worker thread.
+    :param source: Returns the current value (plain or async function). Polled while the tile is visible.
+    :param interval: Seconds between polls of 'source'.
+    :param subscribe: Alternative to polling: subscribe(notify) starts pushing values to notify(value)
+        and returns a function that stops it.
+    """
+    def __init__(self, name: str, render: Callable[[Any, Tuple[int, int]], Any],
+                 source: Optional[Callable[[], Any]] = None, interval: float = 1.0,
+                 subscribe: Optional[Callable[[Callable[[Any], None]], Callable[[], None]]] = None):
+        if source is None and subscribe is None:
+            raise ValueError(f"Live tile {name!r} needs a source or a subscribe function")
+        self.name = name
+        self.render = render
+        self.source = source
+        self.interval = interval
+        self.subscribe = subscribe
+        self.value: Any = _UNSET
+        # size -> (value, frame) of the last draw
+        self._frames: Dict[Tuple[int, int], Tuple[Any, Optional[bytes]]] = {}
+
+    def __repr__(self):
+        return f"LiveTile({self.name!r})"
+
+    async def read(self) -> Any:
+        value = self.source()
+        if inspect.isawaitable(value):
+            value = await value
+        return value
+
+    def _draw(self, value: Any, size: Tuple[int, int]):
+        drawn = self.render(value, size)
+        if drawn is None or isinstance(drawn, str):
+            return drawn
+        return _encode(drawn)
+
+    async def frame(self, size: Tuple[int, int]) -> Optional[bytes]:
+        """
+        The device-ready image for the current value, drawn only if the value changed since the last draw.
+        """
+        if self.value is _UNSET:
+            if self.source is None:
+                return None  # nothing pushed yet
+            self.value = await self.read()
+        value, size = self.value, tuple(size)
+        cached = self._frames.get(size)
+        if cached is not None and cached[0] == value:
+            return cached[1]
+
+        drawn = await asyncio.get_running_loop().run_in_executor(None, self._draw, value, size)
+        if isinstance(drawn, str):
+            from .render_pipeline import render_pipeline
+
+            drawn = await render_pipeline.render_icon(drawn, size)
+        self._frames[size] = (value, drawn)
+        return drawn
+
+
+class LiveTileScheduler:
+    """
+    Polls and subscribes to the live tiles of every deck's visible page, and asks
+    the buttons showing a tile to redraw when its value changes.
+    """
+    def __init__(self):
+        self._watchers: Dict[LiveTile, Set[Any]] = {}  # tile -> buttons that have it in a state
+        self._visible: Dict[int, List[Any]] = {}  # id(manager) -> watched buttons of its current page
+        self._unsubscribe: Dict[LiveTile, Callable[[], None]] = {}
+        self._due: List[Tuple[float, int, LiveTile]] = []  # heap of next polls
+        self._scheduled: Set[LiveTile] = set()  # tiles in _due
+        self._order = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.polls = 0
+        self.changes = 0
+
+    def show(self, manager, page):
+        """
+        'page' is now what 'manager' shows: watch its live tiles and stop watching the previous page's.
+        """
+        self.hide(manager)
+        buttons = [button for _, _, button in page.iter_buttons()
+                   if any(state.live is not None for state in button.states)]
+        self._visible[id(manager)] = buttons
+        for button in buttons:
+            for state in button.states:
+                if state.live is not None:
+                    self._watch(state.live, button)
+
+    def hide(self, manager):
+        for button in self._visible.pop(id(manager), ()):
+            for state in button.states:
+                if state.live is not None:
+                    self._unwatch(state.live, button)
+
+    def watching(self) -> List[LiveTile]:
+        return list(self._watchers)
+
+    def _watch(self, tile: LiveTile, button):
+        watchers = self._watchers.setdefault(tile, set())
+        watchers.add(button)
+        if len(watchers) > 1:
+            return
+        if tile.subscribe is not None:
+            loop = asyncio.get_running_loop()
+            self._unsubscribe[tile] = tile.subscribe(
+                lambda value, tile=tile: loop.call_soon_threadsafe(self._changed, tile, value))
+        elif tile not in self._scheduled:
+            self._scheduled.add(tile)
+            # A value left over from the last time the tile was visible may be stale
+            first = time.monotonic() + (tile.interval if tile.value is _UNSET else 0.0)
+            heapq.heappush(self._due, (first, next(self._order), tile))
+            self._wake()
+
+    def _unwatch(self, tile: LiveTile, button):
+        watchers = self._watchers.get(tile)
+        if watchers is None:
+            return
+        watchers.discard(button)
+        if watchers:
+            return
+        del self._watchers[tile]
+        unsubscribe = self._unsubscribe.pop(tile, None)
+        if unsubscribe is not None:
+            unsubscribe()
+        # A polled tile drops out of the heap the next time it comes due
+
+    def _changed(self, tile: LiveTile, value: Any):
+        if value == tile.value:
+            return
+        tile.value = value
+        self.changes += 1
+        for button in self._watchers.get(tile, ()):
+            if button.live is tile:
+                button.request_render()
+
+    def _wake(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            if not self._due:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            delay = self._due[0][0] - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    # Woken early when a tile is added with an earlier deadline
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            due, _, tile = heapq.heappop(self._due)
+            if tile not in self._watchers:
+                self._scheduled.discard(tile)
+                continue
+            try:
+                self.polls += 1
+                self._changed(tile, await tile.read())
+            except Exception as e:
+                logger.error("Live tile %s failed to read: %s", tile.name, e)
+            # Keep the cadence, but never try to catch up on missed polls
+            heapq.heappush(self._due, (max(due + tile.interval, time.monotonic()), next(self._order), tile))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Shared by every PageManager, so a tile shown on several decks is polled once
+live_tiles = LiveTileScheduler()
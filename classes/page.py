@@ -1,133 +1,194 @@
 # file: classes/page.py
 
-from typing import List, Optional, Tuple, Any, Callable
+from typing import Awaitable, Dict, Iterator, List, Optional, Sequence, Tuple, Any, Callable
 
-from logger import logger
+from logger import get_logger
 from .base import ItemState
 from .button import Button
 from .dial import Dial
+from .events import ButtonPress, DialPress, DialRotate, Event, LedSwipe, LedTap, from_tuple
 from .led import Led
 from .led_dial import LCDDial
 
+logger = get_logger(__name__)
+
+# Shown at (0,0) on every page created through create_child()
+BACK_ICON = "Icons/arrow-left-top.svg"
 
 class Page:
     """
     A single "screen" or layout of Buttons, Dials, and LEDs.
+    Controls are stored sparsely: a page only pays for the keys and dials it uses.
     """
+    __slots__ = ("super", "name", "parent", "children", "siblings", "_buttons", "_dials", "led")
+
     def __init__(self, page_manager, name: str, parent: Optional['Page'] = None):
         self.super = page_manager
         self.name = name
         self.parent = parent
-        self.children: List[Page] = []
-        self.siblings: List[Page] = []
-        num_button_rows: int = self.super.deck.KEY_ROWS
-        num_button_cols: int = self.super.deck.KEY_COLS
-        self.buttons: List[List[Optional[Button]]] = [[None] * num_button_cols for _ in range(num_button_rows)]
-        num_dials = self.super.deck.DIAL_COUNT
-        self.dials: List[Optional[Dial]] = [None] * num_dials
-        num_led_keys = self.super.deck.KEY_COLS
+        # Shared empty tuples until the first page is added
+        self.children: Sequence[Page] = ()
+        self.siblings: Sequence[Page] = ()
+        # Key index (row * KEY_COLS + col) -> Button
+        self._buttons: Dict[int, Button] = {}
+        # Dial index -> Dial; most pages have none, so the dict is only made for the first one
+        self._dials: Optional[Dict[int, Dial]] = None
         # TODO: Add touchbuttons instead of/alongside LEDs
-        self.leds: List[Led] = [None] * num_led_keys
-        logger.debug(f"Created Page: {name} with {num_button_rows}x{num_button_cols} buttons, {num_dials} dials, and {num_led_keys} LEDs.")
+        self.led: Optional[Led] = None
+        logger.debug("Created Page: %s", name)
+
+    def _key(self, row: int, col: int) -> Optional[int]:
+        deck = self.super.deck
+        if 0 <= row < deck.KEY_ROWS and 0 <= col < deck.KEY_COLS:
+            return row * deck.KEY_COLS + col
+        return None
+
+    def button(self, row: int, col: int) -> Optional[Button]:
+        """
+        The button at (row, col), or None for an empty key or one the deck does not have.
+        """
+        key = self._key(row, col)
+        return self._buttons.get(key) if key is not None else None
+
+    def add_button(self, row: int, col: int, button):
+        key = self._key(row, col)
+        if key is None:
+            raise IndexError(f"Key ({row},{col}) is outside the {self.super.deck.KEY_ROWS}x{self.super.deck.KEY_COLS} deck")
+        self._buttons[key] = button
+
+    def dial(self, dial_idx: int) -> Optional[Dial]:
+        return self._dials.get(dial_idx) if self._dials else None
+
+    def add_dial(self, dial_idx: int, dial):
+        if not 0 <= dial_idx < self.super.deck.DIAL_COUNT:
+            raise IndexError(f"Dial {dial_idx} does not exist; the deck has {self.super.deck.DIAL_COUNT}")
+        if self._dials is None:
+            self._dials = {}
+        self._dials[dial_idx] = dial
 
     def create_child(self, name: str, icon: Optional[str], coordinates: tuple[int,int]) -> Optional['Page']:
         x,y = coordinates
-        max_y, max_x = ((self.super.deck.KEY_COUNT // self.super.deck.KEY_ROWS), self.super.deck.KEY_ROWS)
+        max_x, max_y = self.super.deck.KEY_ROWS, self.super.deck.KEY_COLS
         if x >= max_x or y >= max_y:
             logger.error("Your coordinates exceeds the screen's maximum possible size.")
-            logger.error(f"({x},{y}) >= ({max_x},{max_y})")
+            logger.error("(%s,%s) >= (%s,%s)", x, y, max_x, max_y)
             return None
-        elif self.buttons[x][y] is not None:
+        elif self.button(x, y) is not None:
             return None
         new_page = Page(self.super, name, self)
-        self.children.append(new_page)
-        back_button = Button((0,0),new_page, [ItemState("Icons/arrow-left-top.svg", self.name)])
-        back_button.set_async_function(lambda: self.super.go_to_page(self))
-        new_page.buttons[0][0] = back_button
+        self.add_child(new_page)
+        back_button = Button((0,0),new_page, [ItemState(BACK_ICON, self.name)])
+        # Going back, so it slides the other way
+        back_button.set_async_function(lambda: self.super.go_back())
         new_page_button = Button((x,y),self, [ItemState(icon,name)])
         new_page_button.set_async_function(lambda: self.super.go_to_page(new_page))
         return new_page
 
     def create_button(self, coordinates: Tuple[int, int], visible: List[ItemState], function: Callable[..., Any]):
         x, y = coordinates
-        if self.buttons[x][y] is not None:
+        if self.button(x, y) is not None:
             logger.error("Button already exists at this location.")
             return
         new_button = Button(coordinates, self, visible)
         new_button.set_async_function(function)
-        self.buttons[x][y] = new_button
         return new_button
 
     def create_dial(self, idx: int, visible: List[ItemState], function: Callable[..., Any]):
-        if self.dials[idx] is not None:
+        if self.dial(idx) is not None:
             logger.error("Dial already exists at this location.")
             return
-        new_dial = LCDDial(self.leds[0],idx,  visible)
+        # TODO: Pair the dial with its LCDDial touch-strip region once Led is wired up
+        new_dial = Dial(idx, self, visible)
         new_dial.set_rotation_function(func=function)
-        # TODO:
         return new_dial
 
     def add_child(self, child_page: 'Page'):
+        if not self.children:
+            self.children = []
         self.children.append(child_page)
 
+    def iter_buttons(self) -> Iterator[Tuple[int, int, Button]]:
+        """
+        Yield (row, col, button) for every key that has a button, in key order.
+        """
+        cols = self.super.deck.KEY_COLS
+        for key in sorted(self._buttons):
+            yield key // cols, key % cols, self._buttons[key]
+
+    def reachable_pages(self) -> List['Page']:
+        """
+        Pages one navigation away from this one: children, parent and siblings.
+        """
+        reachable: List[Page] = []
+        for page in (*self.children, self.parent, *self.siblings):
+            if page is not None and page is not self and page not in reachable:
+                reachable.append(page)
+        return reachable
+
 
-    async def handle_input_async(self, event: Tuple):
+    def handle_input_async(self, event: Event) -> Awaitable[None]:
         """
         ASYNC version of handle_input.
-        event can be:
-          ("button_press", row, col)
-          ("dial_press", dial_idx)
-          ("dial_rotate", dial_idx, direction, steps)
-          ("led_swipe", direction)
-          ("led_tap", x, y)
+        event is one of the typed events in classes/events.py:
+          ButtonPress(row, col)
+          DialPress(dial)
+          DialRotate(dial, direction, steps)
+          LedSwipe(direction)
+          LedTap(x, y)
+        Legacy ("button_press", row, col)-style tuples are still accepted.
+        Returns the handler's coroutine directly, so awaiting this costs no extra frame.
         """
-        etype = event[0]
-        if etype == "button_press":
-            row = event[1]
-            col = event[2]
-            if 0 <= row < len(self.buttons) and 0 <= col < len(self.buttons[row]):
-                btn = self.buttons[row][col]
-                if btn is not None:
-                    # We assume 'btn' is an AsyncButton with async .press()
-                    logger.debug(f"Pressing button {row},{col}")
-                    await btn.press()
-                else:
-                    logger.warning(f"No button at {row},{col}")
-            else:
-                logger.warning(f"Invalid button coordinates: {row},{col}")
-
-        elif etype == "dial_press":
-            dial_idx = event[1]
-            if 0 <= dial_idx < len(self.dials):
-                logger.debug(f"Pressing dial {dial_idx}")
-                await self.dials[dial_idx].press()
-            else:
-                logger.warning(f"Invalid dial index: {dial_idx}")
-
-        elif etype == "dial_rotate":
-            dial_idx = event[1]
-            direction = event[2]
-            steps = event[3]
-            if 0 <= dial_idx < len(self.dials):
-                logger.debug(f"Rotating dial {dial_idx} {steps} steps {direction}")
-                await self.dials[dial_idx].on_rotate(direction, steps)
-            else:
-                logger.warning(f"Invalid dial index: {dial_idx}")
-
-        elif etype == "led_swipe":
-            direction = event[1]
-            if self.leds:
-                logger.debug(f"Swiping LED {direction}")
-                await self.leds[0].on_swipe(direction)
-            else:
-                logger.warning("No LEDs on this page.")
-
-        elif etype == "led_tap":
-            x = event[1]
-            y = event[2]
-            if self.leds:
-                logger.debug(f"Tapping LED {x},{y}")
-                await self.leds[0].on_tap(x, y)
-            else:
-                logger.warning("No LEDs on this page.")
+        handler = _HANDLERS.get(type(event))
+        if handler is None:
+            event = from_tuple(event)
+            handler = _HANDLERS[type(event)]
+        return handler(self, event)
+
+    async def _on_button_press(self, event: ButtonPress):
+        row, col = event
+        btn = self.button(row, col)
+        if btn is None:
+            logger.warning("No button at %s,%s", row, col)
+            return
+        logger.debug("Pressing button %s,%s", row, col)
+        await btn.press()
+
+    async def _on_dial_press(self, event: DialPress):
+        dial = self.dial(event.dial)
+        if dial is None:
+            logger.warning("Invalid dial index: %s", event.dial)
+            return
+        logger.debug("Pressing dial %s", event.dial)
+        await dial.press()
+
+    async def _on_dial_rotate(self, event: DialRotate):
+        dial = self.dial(event.dial)
+        if dial is None:
+            logger.warning("Invalid dial index: %s", event.dial)
+            return
+        logger.debug("Rotating dial %s %s steps %s", event.dial, event.steps, event.direction)
+        await dial.on_rotate(event.direction, event.steps)
+
+    async def _on_led_swipe(self, event: LedSwipe):
+        if self.led is None:
+            logger.warning("No LEDs on this page.")
+            return
+        logger.debug("Swiping LED %s", event.direction)
+        await self.led.on_swipe(event.direction)
+
+    async def _on_led_tap(self, event: LedTap):
+        if self.led is None:
+            logger.warning("No LEDs on this page.")
+            return
+        logger.debug("Tapping LED %s,%s", event.x, event.y)
+        await self.led.on_tap(event.x, event.y)
+
 
+# Event type -> Page handler; one dict lookup replaces the old if/elif chain
+_HANDLERS = {
+    ButtonPress: Page._on_button_press,
+    DialPress: Page._on_dial_press,
+    DialRotate: Page._on_dial_rotate,
+    LedSwipe: Page._on_led_swipe,
+    LedTap: Page._on_led_tap,
+}
@@ -0,0 +1,405 @@
+# file: classes/page_config.py
+"""
+Declarative page trees. A config file (JSON, or TOML on Python 3.11+) lists
+pages by id with their child links, buttons and dials; see config/pages.json
+and the schema next to it. Pages are only constructed the first time they are
+needed, so the size of the config does not affect startup.
+"""
+import json
+import os
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from logger import get_logger
+from .base import ItemState
+from .button import Button
+from .icon_catalog import icon_catalog
+from .page import BACK_ICON, Page
+
+logger = get_logger(__name__)
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "pages.schema.json")
+
+# Handled by the PageTree itself rather than by a function in functions/
+NAVIGATION_ACTIONS = ("go_back", "go_to_page")
+
+
+class ConfigError(ValueError):
+    """
+    The page config is malformed or refers to something that does not exist.
+    """
+    def __init__(self, message: str, where: str = ""):
+        super().__init__(f"{where}: {message}" if where else message)
+        self.where = where
+
+
+_actions: Dict[str, Callable[..., Any]] = {}
+_bindings: Dict[str, Callable[[Any, Any], None]] = {}
+_live_tile_factories: Dict[str, Callable[[], Any]] = {}
+_live_tiles: Dict[str, Any] = {}
+
+
+def register_action(name: str, func: Callable[..., Any]):
+    """
+    Make 'func' available to configs as "action": name.
+    """
+    _actions[name] = func
+
+
+def register_binding(name: str, func: Callable[[Any, Any], None]):
+    """
+    Make 'func(item, manager)' available to configs as "bind": name. It is called
+    once the item is built and should keep the item's state in sync with the system.
+    """
+    _bindings[name] = func
+
+
+def register_live_tile(name: str, factory: Callable[[], Any]):
+    """
+    Make 'factory()' (returning a LiveTile) available to configs as a state's "live": name.
+    """
+    _live_tile_factories[name] = factory
+    _live_tiles.pop(name, None)
+
+
+def get_live_tile(name: str):
+    """
+    The LiveTile for a name. Every state naming it shares one tile, so it is polled once.
+    """
+    if not _live_tile_factories:
+        from functions.live_tiles import LIVE_TILES
+
+        for builtin, factory in LIVE_TILES.items():
+            _live_tile_factories.setdefault(builtin, factory)
+    tile = _live_tiles.get(name)
+    if tile is None:
+        try:
+            factory = _live_tile_factories[name]
+        except KeyError:
+            raise ConfigError(f"Unknown live tile {name!r}") from None
+        tile = _live_tiles[name] = factory()
+    return tile
+
+
+def _register_builtin_actions():
+    from functions import audio_functions, system_functions, video_functions
+
+    for module in (audio_functions, system_functions, video_functions):
+        for name, func in vars(module).items():
+            if callable(func) and getattr(func, "__module__", None) == module.__name__ and not name.startswith("_"):
+                _actions.setdefault(name, func)
+
+
+def get_action(name: str) -> Callable[..., Any]:
+    if not _actions:
+        _register_builtin_actions()
+    try:
+        return _actions[name]
+    except KeyError:
+        raise ConfigError(f"Unknown action {name!r}") from None
+
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+
+def _validate(value: Any, schema: dict, root: dict, where: str):
+    """
+    Check 'value' against the subset of JSON Schema used by pages.schema.json.
+    """
+    ref = schema.get("$ref")
+    if ref is not None:
+        target = root
+        for part in ref.lstrip("#/").split("/"):
+            target = target[part]
+        schema = target
+
+    expected = schema.get("type")
+    if expected is not None:
+        # bool is an int in Python but never a valid number here
+        if not isinstance(value, _TYPES[expected]) or (isinstance(value, bool) and expected != "boolean"):
+            raise ConfigError(f"expected {expected}, got {type(value).__name__}", where)
+    if "enum" in schema and value not in schema["enum"]:
+        raise ConfigError(f"must be one of {schema['enum']}, got {value!r}", where)
+    if "minimum" in schema and value < schema["minimum"]:
+        raise ConfigError(f"must be at least {schema['minimum']}", where)
+    if "pattern" in schema and not re.search(schema["pattern"], value):
+        raise ConfigError(f"{value!r} does not match {schema['pattern']}", where)
+
+    if isinstance(value, dict):
+        for name in schema.get("required", ()):
+            if name not in value:
+                raise ConfigError(f"missing required field {name!r}", where)
+        properties = schema.get("properties", {})
+        extra = schema.get("additionalProperties", True)
+        for name, item in value.items():
+            if name in properties:
+                _validate(item, properties[name], root, f"{where}.{name}")
+            elif extra is False:
+                raise ConfigError(f"unknown field {name!r}", where)
+            elif isinstance(extra, dict):
+                _validate(item, extra, root, f"{where}.{name}")
+    elif isinstance(value, list):
+        if "minItems" in schema and len(value) < schema["minItems"]:
+            raise ConfigError(f"needs at least {schema['minItems']} items", where)
+        if "maxItems" in schema and len(value) > schema["maxItems"]:
+            raise ConfigError(f"allows at most {schema['maxItems']} items", where)
+        if "items" in schema:
+            for index, item in enumerate(value):
+                _validate(item, schema["items"], root, f"{where}[{index}]")
+
+
+_schema: Optional[dict] = None
+
+
+def _load_schema() -> dict:
+    global _schema
+    if _schema is None:
+        with open(SCHEMA_PATH, encoding="utf-8") as f:
+            _schema = json.load(f)
+    return _schema
+
+
+def _read(path: str) -> dict:
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == ".toml":
+            try:
+                import tomllib
+            except ImportError:
+                raise ConfigError("TOML configs need Python 3.11 or newer", path) from None
+            with open(path, "rb") as f:
+                return tomllib.load(f)
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except OSError as e:
+        raise ConfigError(f"cannot read config: {e}", path) from None
+    except ValueError as e:  # JSONDecodeError and TOMLDecodeError both derive from it
+        if isinstance(e, ConfigError):
+            raise
+        raise ConfigError(f"cannot parse config: {e}", path) from None
+
+
+def _parents(config: dict) -> Dict[str, str]:
+    """
+    Map every linked page id to the id of the page linking to it.
+    """
+    pages = config["pages"]
+    parents: Dict[str, str] = {}
+    for page_id, spec in pages.items():
+        for index, link in enumerate(spec.get("children", ())):
+            child = link["page"]
+            where = f"pages.{page_id}.children[{index}]"
+            if child not in pages:
+                raise ConfigError(f"links to unknown page {child!r}", where)
+            if child == config["root"]:
+                raise ConfigError("the root page cannot be a child", where)
+            if child in parents:
+                raise ConfigError(f"page {child!r} is already a child of {parents[child]!r}", where)
+            parents[child] = page_id
+    return parents
+
+
+def load_config(path: str) -> dict:
+    """
+    Read and validate a page config. Raises ConfigError describing the first problem found.
+    """
+    config = _read(path)
+    schema = _load_schema()
+    _validate(config, schema, schema, "config")
+
+    if config["root"] not in config["pages"]:
+        raise ConfigError(f"root page {config['root']!r} is not defined", "config.root")
+    parents = _parents(config)
+
+    for page_id, spec in config["pages"].items():
+        # Every page must hang off the root; a parent chain that never gets there is a cycle
+        seen = {page_id}
+        ancestor = parents.get(page_id)
+        while ancestor is not None and ancestor not in seen:
+            seen.add(ancestor)
+            ancestor = parents.get(ancestor)
+        if ancestor is not None:
+            raise ConfigError("page is part of a cycle", f"pages.{page_id}")
+        if page_id != config["root"] and page_id not in parents:
+            logger.warning("Page %r in %s is not reachable from %r", page_id, path, config['root'])
+
+        for kind in ("buttons", "dials"):
+            for index, item in enumerate(spec.get(kind, ())):
+                where = f"pages.{page_id}.{kind}[{index}]"
+                action = item.get("action")
+                if action is not None and action not in NAVIGATION_ACTIONS:
+                    try:
+                        get_action(action)
+                    except ConfigError as e:
+                        raise ConfigError(str(e), where) from None
+                if action == "go_to_page" and item.get("args", {}).get("page") not in config["pages"]:
+                    raise ConfigError("go_to_page needs args.page naming a defined page", where)
+                for state in item["states"]:
+                    if state.get("live") is not None:
+                        try:
+                            get_live_tile(state["live"])
+                        except ConfigError as e:
+                            raise ConfigError(str(e), where) from None
+
+    # Checked once here, so rendering never has to look for the file
+    missing = icon_catalog.missing(config_icons(config))
+    if missing:
+        problems = []
+        for icon in missing:
+            suggestions = icon_catalog.suggest(icon)
+            problems.append(f"{icon!r} (did you mean {', '.join(suggestions)}?)" if suggestions else repr(icon))
+        raise ConfigError(f"unknown icons: {'; '.join(problems)}", path)
+    return config
+
+
+def config_icons(config: dict) -> Set[str]:
+    """
+    Every icon path a config refers to, including the back arrow of child pages.
+    """
+    icons: Set[str] = set()
+    for spec in config["pages"].values():
+        for link in spec.get("children", ()):
+            if link.get("icon"):
+                icons.add(link["icon"])
+            icons.add(BACK_ICON)
+        for kind in ("buttons", "dials"):
+            for item in spec.get(kind, ()):
+                icons.update(state["image"] for state in item["states"] if state.get("image"))
+    return icons
+
+
+def _states(specs: List[dict]) -> List[ItemState]:
+    return [ItemState(spec.get("image"), spec.get("title"), spec.get("tint"),
+                      get_live_tile(spec["live"]) if spec.get("live") else None,
+                      spec.get("title_position"), spec.get("transition")) for spec in specs]
+
+
+class PageTree:
+    """
+    Builds the Pages of a validated config on demand. Only the root exists after
+    construction; every other page is created the first time it is navigated to
+    (or prefetched, see neighbours()), together with its ancestors. The tree
+    registers itself as its manager's page_tree.
+    """
+    def __init__(self, manager, config: dict):
+        self.manager = manager
+        self.config = config
+        self.specs: Dict[str, dict] = config["pages"]
+        self.parents = _parents(config)
+        self._pages: Dict[str, Page] = {}
+        self._ids: Dict[int, str] = {}  # id(page) -> page id
+        self._check()
+        manager.page_tree = self
+
+    def _check(self):
+        """
+        Catch keys and dials the connected deck does not have, and bindings nobody
+        registered, before any page is built.
+        """
+        deck = self.manager.deck
+        for page_id, spec in self.specs.items():
+            used: Set[Tuple[int, int]] = {(0, 0)} if page_id in self.parents else set()
+            items = [("children", link) for link in spec.get("children", ())]
+            items += [("buttons", button) for button in spec.get("buttons", ())]
+            for kind, item in items:
+                row, col = item["key"]
+                where = f"pages.{page_id}.{kind}"
+                if item.get("bind") is not None and item["bind"] not in _bindings:
+                    raise ConfigError(f"Unknown binding {item['bind']!r}", where)
+                if row >= deck.KEY_ROWS or col >= deck.KEY_COLS:
+                    raise ConfigError(f"key {[row, col]} is outside the {deck.KEY_ROWS}x{deck.KEY_COLS} deck", where)
+                if (row, col) in used:
+                    raise ConfigError(f"key {[row, col]} is already taken", where)
+                used.add((row, col))
+            for dial in spec.get("dials", ()):
+                if dial["index"] >= deck.DIAL_COUNT:
+                    raise ConfigError(f"dial {dial['index']} does not exist; the deck has {deck.DIAL_COUNT}",
+                                      f"pages.{page_id}.dials")
+
+    @property
+    def root(self) -> Page:
+        return self.get(self.config["root"])
+
+    def get(self, page_id: str) -> Page:
+        page = self._pages.get(page_id)
+        if page is None:
+            page = self._build(page_id)
+        return page
+
+    def built(self) -> Iterator[Tuple[str, Page]]:
+        """
+        Yield (page_id, page) for the pages constructed so far.
+        """
+        return iter(self._pages.items())
+
+    def neighbours(self, page: Page) -> List[Page]:
+        """
+        The pages one press away from 'page': its parent, the children it links to
+        and its go_to_page targets. Those not built yet are built now, which is
+        cheap; nothing is rendered until a page is shown or prefetched.
+        """
+        page_id = self._ids.get(id(page))
+        if page_id is None:
+            return page.reachable_pages()
+        spec = self.specs[page_id]
+        targets = [link["page"] for link in spec.get("children", ())]
+        for kind in ("buttons", "dials"):
+            targets += [item["args"]["page"] for item in spec.get(kind, ()) if item.get("action") == "go_to_page"]
+        if page_id in self.parents:
+            targets.append(self.parents[page_id])
+        return [self.get(target) for target in dict.fromkeys(targets) if target != page_id]
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def _navigation(self, action: str, args: dict) -> Callable[[], Any]:
+        # Dials pass direction/step, which navigation has no use for
+        if action == "go_back":
+            return lambda **_: self.manager.go_back()
+        target = args["page"]
+        return lambda **_: self.manager.go_to_page(self.get(target))
+
+    def _build(self, page_id: str) -> Page:
+        spec = self.specs[page_id]
+        parent_id = self.parents.get(page_id)
+        parent = self.get(parent_id) if parent_id is not None else None
+        page = Page(self.manager, spec["name"], parent)
+        self._pages[page_id] = page
+        self._ids[id(page)] = page_id
+        logger.debug("Built page %r (%s/%s)", page_id, len(self._pages), len(self.specs))
+
+        if parent is not None:
+            parent.add_child(page)
+            back_button = Button((0, 0), page, [ItemState(BACK_ICON, parent.name)])
+            # Going back, so it slides the other way
+            back_button.set_async_function(lambda: self.manager.go_back())
+
+        for link in spec.get("children", ()):
+            child_id = link["page"]
+            link_button = Button(tuple(link["key"]), page, [ItemState(link.get("icon"), self.specs[child_id]["name"])])
+            # Resolved at press time, so the child is only built when someone goes there
+            link_button.set_async_function(lambda child_id=child_id: self.manager.go_to_page(self.get(child_id)))
+
+        for item in spec.get("buttons", ()):
+            button = Button(tuple(item["key"]), page, _states(item["states"]))
+            self._wire(button, item, button.set_async_function)
+        for item in spec.get("dials", ()):
+            dial = page.create_dial(item["index"], _states(item["states"]), None)
+            self._wire(dial, item, dial.set_rotation_function)
+        return page
+
+    def _wire(self, item, spec: dict, set_function: Callable[..., None]):
+        action = spec.get("action")
+        if action in NAVIGATION_ACTIONS:
+            set_function(self._navigation(action, spec.get("args", {})))
+        elif action is not None:
+            set_function(get_action(action), spec.get("args"))
+        if spec.get("bind") is not None:
+            _bindings[spec["bind"]](item, self.manager)
@@ -1,110 +1,488 @@
 # file: classes/page_manager.py
-from typing import Optional, Tuple
+import asyncio
+import hashlib
+import os
+from typing import Dict, List, Optional, Tuple
 
-from logger import logger
+from logger import get_logger
+from tracing import tracer
+from .animation import animator
+from .event_queue import EventQueue
+from .device_writer import DeviceWriter
+from .events import DialRotate, Event, RenderKey, RenderPage
+from .icon_atlas import load_atlas
+from .icon_cache import icon_cache
+from .live_tile import live_tiles
 from .page import Page
+from .render_pipeline import render_pipeline
+from .render_scheduler import RenderScheduler
+from .rotation_aggregator import AccelerationCurve, RotationAggregator
+from .strip_compositor import StripCompositor
+
+logger = get_logger(__name__)
 
 class PageManager:
     """
     Tracks the active Page. Forwards events to the current page.
     Also stores a reference to the 'deck' so we can re-render icons on page switch.
+    Every connected deck gets a PageManager of its own; 'name' (e.g. the serial) labels its logs and writer thread.
     """
-    def __init__(self):
+    def __init__(self, name: str = "deck"):
+        self.name = name
         self.current_page: Optional[Page] = None
         self.deck = None  # We'll set this later with set_deck()
+        # USB writes go through a thread per deck, so a slow deck only holds up itself
+        self.writer = DeviceWriter(name)
+        # Digest of the last frame written to each key, so unchanged keys are never re-sent
+        self._sent_frames: Dict[int, bytes] = {}
+        # The frames themselves, replayed when an unplugged deck comes back (see reattach())
+        self._frames: Dict[int, bytes] = {}
+        self.attached = False
+        # Background warm-up of the pages one hop away from the current one
+        self._prefetch_task: Optional[asyncio.Task] = None
+        self.prefetch_delay = 0.05  # seconds of quiet before prefetching starts
+        self.prefetch_budget_bytes = 4 * 1024 * 1024  # per navigation
+        # Set by a PageTree, which knows the links of pages it has not built yet
+        self.page_tree = None
+        # Dial ticks are merged per dial before they reach the page's actions
+        self.dial_window = 0.05  # seconds
+        # Fast spins take bigger steps only if asked to: actions already scale the ticks themselves
+        accelerate = os.environ.get("STREAMDECK_DIAL_ACCELERATION", "") not in ("", "0")
+        self.dial_acceleration: Optional[AccelerationCurve] = AccelerationCurve() if accelerate else None
+        self._dial_aggregators: Dict[int, RotationAggregator] = {}
+        # Device callbacks post here; a single consumer task hands events to the current page
+        self.events = EventQueue()
+        self._consumer: Optional[asyncio.Task] = None
+        # Redraw requests are batched and capped at scheduler.max_fps
+        self.scheduler = RenderScheduler(self, max_fps=30)
+        # Only for decks with a touchscreen (Stream Deck+)
+        self.strip_compositor: Optional[StripCompositor] = None
+        # "slide" (forward/back), "fade" or "none"; see animation.py
+        self.page_transition = os.environ.get("STREAMDECK_PAGE_TRANSITION", "slide")
+        self.transition_time = 0.15  # seconds
+        # "none" turns off the crossfades states opt into (transition "fade")
+        self.state_transition = os.environ.get("STREAMDECK_STATE_TRANSITION", "fade")
+        self.state_transition_time = 0.1  # seconds
+        # The page transition playing in the background, and the frames it ends on
+        self._transition: Optional[asyncio.Task] = None
+        self._transition_page: Optional[Page] = None
+        self._transition_frames: Optional[List[bytes]] = None
+        # Running state crossfades: key -> (task, the frame it ends on)
+        self._key_animations: Dict[int, Tuple[asyncio.Task, bytes]] = {}
 
     def set_deck(self, deck):
         self.deck = deck
+        self.attached = True
+        self.writer.paused = False
+        self._frames.clear()
+        has_strip = getattr(deck, "TOUCHSCREEN_PIXEL_WIDTH", 0) > 0
+        self.strip_compositor = StripCompositor(deck, self.writer) if has_strip else None
+        self.invalidate_frames()
+        # Prefer pre-rendered tiles (see compile_icons.py) over rasterizing SVGs. Loaded
+        # once per key format, shared by decks of that format and kept across reconnects
+        size = deck.key_image_format()["size"]
+        if not icon_cache.has_atlas(size):
+            atlas = load_atlas(size)
+            if atlas is not None:
+                icon_cache.attach_atlas(atlas)
 
-    async def set_current_page(self, page: Page):
+    async def set_current_page(self, page: Page, transition: Optional[str] = None):
+        # Whatever we were warming up for the previous page is stale now
+        self.cancel_prefetch()
         self.current_page = page
+        # Only the live tiles of the page on screen are kept up to date
+        live_tiles.show(self, page)
         # Instead of just printing, we call a new method that updates the device icons
-        await self.render_page(page)
+        await self.render_page(page, transition)
+        self._prefetch_task = asyncio.create_task(self._prefetch_neighbours(page))
+
+    def cancel_prefetch(self):
+        if self._prefetch_task is not None and not self._prefetch_task.done():
+            self._prefetch_task.cancel()
+        self._prefetch_task = None
+
+    async def _prefetch_neighbours(self, page: Page):
+        """
+        Render the frames of every page reachable in one hop from 'page' into the
+        icon cache, so navigating there only has to blit cached frames.
+        Runs one icon at a time after a short quiet period, leaving the other
+        pipeline workers and the event loop to foreground work. Prefetched frames
+        go into the LRU like any other, evicting its coldest entries; only frames
+        that actually had to be rendered count against prefetch_budget_bytes.
+        """
+        try:
+            await asyncio.sleep(self.prefetch_delay)
+            budget = self.prefetch_budget_bytes
+            neighbours = self.page_tree.neighbours(page) if self.page_tree is not None else page.reachable_pages()
+            for neighbour in neighbours:
+                for _, _, button in neighbour.iter_buttons():
+                    # Live tiles cost nothing until their page is shown
+                    if button.live is not None:
+                        continue
+                    if budget <= 0:
+                        logger.debug("Prefetch for %s stopped at its memory budget", page.name)
+                        return
+                    # A cached frame is just a hit (and stays warm); a miss is rendered
+                    misses = icon_cache.misses
+                    frame = await button.frame()
+                    if frame is not None and icon_cache.misses != misses:
+                        budget -= len(frame)
+        except Exception as e:
+            logger.error("Prefetch for %s failed: %s", page.name, e)
+
+    def _transition_for(self, forward: bool) -> Optional[str]:
+        if self.page_transition == "slide":
+            return "slide_left" if forward else "slide_right"
+        if self.page_transition == "fade":
+            return "fade"
+        return None
 
     async def go_to_page(self, page: Page):
-        await self.set_current_page(page)
+        await self.set_current_page(page, self._transition_for(forward=True))
 
     async def go_back(self):
         if self.current_page and self.current_page.parent:
-            await self.set_current_page(self.current_page.parent)
+            await self.set_current_page(self.current_page.parent, self._transition_for(forward=False))
 
-    async def handle_event(self, event: Tuple):
+    async def handle_event(self, event: Event):
         if self.current_page is not None:
             await self.current_page.handle_input_async(event)
 
-    async def render_page(self, page: Page):
-        """Clear all keys, then set icons only for the new page's buttons."""
+    def post(self, event: Event) -> bool:
+        """
+        Queue an event from a device callback without waiting for it to be handled.
+        """
+        return self.events.put(event)
+
+    async def submit(self, event: Event):
+        """
+        Queue an event and wait until the consumer has handled it.
+        Without a running consumer (see start()) the event is handled inline.
+        """
+        if self._consumer is None or self._consumer.done():
+            await self.handle_event(event)
+            return
+        done = asyncio.get_running_loop().create_future()
+        self.events.put(event, done)
+        await done
+
+    def start(self):
+        if self._consumer is None or self._consumer.done():
+            self._consumer = asyncio.create_task(self._consume())
+
+    async def stop(self):
+        self.cancel_prefetch()
+        self.cancel_transition()
+        self.cancel_key_animations()
+        live_tiles.hide(self)
+        await self.scheduler.stop()
+        if self._consumer is not None:
+            self._consumer.cancel()
+            try:
+                await self._consumer
+            except asyncio.CancelledError:
+                pass
+            self._consumer = None
+        await self.writer.drain()
+        self.writer.shutdown()
+
+    async def _consume(self):
+        """
+        Handle queued events one at a time, most important first.
+        """
+        while True:
+            event, done = await self.events.get()
+            try:
+                kind = type(event)
+                if kind is RenderPage:
+                    self.scheduler.mark_page_dirty()
+                elif kind is RenderKey:
+                    self.request_key_render(event.row, event.col)
+                else:
+                    with tracer.span("dispatch", event=kind.__name__):
+                        await self.handle_event(event)
+            except Exception as e:
+                logger.exception("Failed to handle %s: %s", event, e)
+            finally:
+                if done is not None and not done.done():
+                    done.set_result(None)
+
+    def rotate_dial(self, dial_index: int, steps: int):
+        """
+        Queue signed ticks (positive = right) for a dial. Ticks arriving within
+        dial_window are delivered as one DialRotate event.
+        """
+        aggregator = self._dial_aggregators.get(dial_index)
+        if aggregator is None:
+            async def dispatch(total: int, dial_index=dial_index):
+                direction = "right" if total > 0 else "left"
+                await self.submit(DialRotate(dial_index, direction, abs(total)))
+
+            aggregator = RotationAggregator(dispatch, self.dial_window, self.dial_acceleration)
+            self._dial_aggregators[dial_index] = aggregator
+        aggregator.add(steps)
+
+    def key_index(self, row: int, col: int) -> int:
+        return row * self.deck.KEY_COLS + col
+
+    def push_key_image(self, key_index: int, frame: bytes) -> bool:
+        """
+        Queue a frame for a key unless the key is already showing it.
+        Returns True if a USB write was queued; see writer.drain().
+        While the deck is detached the frame is only remembered, and while a page
+        transition plays it becomes the frame the transition ends on. A crossfade
+        still running on the key is kept if it ends on 'frame', else cut short.
+        """
+        animation = self._key_animations.get(key_index)
+        if animation is not None:
+            if animation[1] == frame:
+                return False
+            animation[0].cancel()
+            del self._key_animations[key_index]
+        if self._transition_frames is not None:
+            self._transition_frames[key_index] = frame
+            return False
+        return self._send_key(key_index, frame)
+
+    def _send_key(self, key_index: int, frame: bytes) -> bool:
+        digest = hashlib.blake2b(frame, digest_size=16).digest()
+        if self._sent_frames.get(key_index) == digest:
+            return False
+        self._sent_frames[key_index] = digest
+        self._frames[key_index] = frame
+        if not self.attached:
+            return False
+
+        def forget(_error, key_index=key_index, digest=digest):
+            # The key shows something else, so the next render must re-send it
+            if self._sent_frames.get(key_index) == digest:
+                self._sent_frames.pop(key_index, None)
+
+        self.writer.submit(self._write_key, key_index, frame, on_error=forget)
+        return True
+
+    def _write_key(self, key_index: int, frame: bytes):
+        # On the writer thread
+        with tracer.span("key_write", key=key_index):
+            self.deck.set_key_image(key_index, frame)
+        tracer.pixels_written()
+
+    def detach(self):
+        """
+        The deck was unplugged. Pages keep rendering, but only into the frame store.
+        """
+        self.attached = False
+        self.writer.paused = True
+        live_tiles.hide(self)
+        logger.info("Detached %s; rendering continues off-device", self.name)
+
+    async def reattach(self, deck) -> int:
+        """
+        Continue on 'deck', the same device plugged back in (and opened), and put
+        back the last frame of every key and the touchscreen. Nothing is re-rendered.
+        Returns the number of writes replayed.
+        """
+        self.deck = deck
+        if self.strip_compositor is not None:
+            self.strip_compositor.deck = deck
+        self.attached = True
+        self.writer.paused = False
+        replayed = self.replay_frames()
+        if self.current_page is not None:
+            # Tiles that changed while we were away are polled again right away
+            live_tiles.show(self, self.current_page)
+        await self.writer.drain()
+        return replayed
+
+    def replay_frames(self) -> int:
+        """
+        Write every remembered frame again, whatever the device is believed to show.
+        """
+        for key_index, frame in self._frames.items():
+            digest = self._sent_frames.get(key_index)
+
+            def forget(_error, key_index=key_index, digest=digest):
+                if digest is not None and self._sent_frames.get(key_index) == digest:
+                    self._sent_frames.pop(key_index, None)
+
+            self.writer.submit(self._write_key, key_index, frame, on_error=forget)
+        replayed = len(self._frames)
+        if self.strip_compositor is not None and self.strip_compositor.showing():
+            self.strip_compositor.push_full()
+            replayed += 1
+        return replayed
+
+    def invalidate_frames(self):
+        """
+        Forget what the keys are showing, e.g. after deck.reset(), so the next render re-sends everything.
+        """
+        self._sent_frames.clear()
+        if self.strip_compositor is not None:
+            self.strip_compositor.invalidate()
+
+    async def render_page(self, page: Page, transition: Optional[str] = None):
+        """
+        Work out the frame for every key of 'page' and write only the keys that changed.
+        With a transition ("fade", "slide_left", "slide_right") the keys animate from
+        what they show now to the new frames, in the background (see finish_transition()).
+        """
         if not self.deck:
             # If we have no deck, we can't render. Just do a fallback print.
             logger.error("No deck set, can't render page.")
             return
 
-        # 1) Clear all keys (in a 4x2 device, that's 8 keys).
-        #    We'll set a plain black image on each key.
-        key_w, key_h = self.deck.key_image_format()["size"]
-        # Create a minimal black image for clearing
-        from PIL import Image
-        import io
-
-        blank_img = Image.new("RGB", (key_w, key_h), "black")
-        blank_bytes_io = io.BytesIO()
-        blank_img.save(blank_bytes_io, format="JPEG")
-        blank_raw = blank_bytes_io.getvalue()
-
-        for key_index in range(8):
-            self.deck.set_key_image(key_index, blank_raw)
-
-        # 2) Now render only the relevant button icons for 'page'
-        #    We'll do something similar to your set_key_image function, but we
-        #    only do it if the button has an image path, etc.
-        #    For each row, col in page.buttons, set that key's image if any.
-        logger.info(f"Rendering page: {page.name}")
-
-        for row_idx, row_of_buttons in enumerate(page.buttons):
-            for col_idx, button in enumerate(row_of_buttons):
-                if button and button.image:
-                    # We'll reuse your logic to set an icon. Let's call
-                    # a helper function "render_key_icon" that sets the icon 
-                    # at (row_idx, col_idx).
-                    await button.render()
-                    #self.render_key_icon(row_idx, col_idx, button.image)
-
-    async def render_current_page(self):
-        if self.current_page:
-            await self.render_page(self.current_page)
-
-    def render_key_icon(self, row, col, svg_path):
-        """
-        This reuses your 'set_key_image' logic on a per-(row,col) basis.
-        """
-        if not svg_path:
-            return
-        import os, io
-        import cairosvg
-        from PIL import Image, ImageChops
+        # 1) Every key starts out as a plain black image...
+        blank_raw = await render_pipeline.blank_frame(self.deck.key_image_format()["size"])
+        frames: List[bytes] = [blank_raw] * self.deck.KEY_COUNT
+
+        # 2) ...and keys with a button get its icon, rasterized concurrently
+        #    on the render pipeline's workers.
+        indices = []
+        renders = []
+        crossfade = set()
+        for row_idx, col_idx, button in page.iter_buttons():
+            # This render covers the key, so it also plays the key's state change
+            if button.take_state_change():
+                crossfade.add(self.key_index(row_idx, col_idx))
+            if button.image or button.title or button.live is not None:
+                indices.append(self.key_index(row_idx, col_idx))
+                renders.append(button.frame())
+        for key_index, frame in zip(indices, await asyncio.gather(*renders)):
+            if frame is not None:
+                frames[key_index] = frame
 
-        key_index = row * 4 + col
-        if not os.path.exists(svg_path):
-            logger.error(f"SVG file not found: {svg_path}")
+        if self._transition is not None:
+            if transition is None and page is self._transition_page:
+                # Redrawn mid-transition (e.g. the RenderPage after a press): end on the new frames
+                self._transition_frames = frames
+                await self.render_strip(page)
+                return
+            # Newer input wins; we carry on from whatever step is on the keys
+            self.cancel_transition()
+
+        old_frames = [self._frames.get(key_index) for key_index in range(len(frames))]
+        if (transition is not None and self.attached
+                and all(frame is not None for frame in old_frames) and old_frames != frames):
+            # Played in the background, so the event consumer is free for the next press
+            self.cancel_key_animations()
+            self._transition_page, self._transition_frames = page, frames
+            self._transition = asyncio.create_task(self._play_transition(transition, old_frames, frames))
+            logger.info("Rendering page on %s: %s (%s transition)", self.name, page.name, transition)
+            await self.render_strip(page)
             return
 
-        # Convert SVG -> PNG
-        png_data = cairosvg.svg2png(url=svg_path)
+        # 3) Only push the keys whose frame differs from what the device shows
+        written = sum(self.animate_key(key_index, frame) if key_index in crossfade
+                      else self.push_key_image(key_index, frame)
+                      for key_index, frame in enumerate(frames))
+        logger.info("Rendering page on %s: %s (%s/%s keys changed)", self.name, page.name, written, len(frames))
+        await self.render_strip(page)
+        await self.writer.drain()
+
+    async def _play_transition(self, transition: str, old_frames: List[bytes], frames: List[bytes]):
+        """
+        Animate every key from 'old_frames' to 'frames', then show the transition's
+        final frames (which renders during the animation may have replaced).
+        Runs as self._transition; whoever cancels it draws the keys instead.
+        """
+        try:
+            sequence = await animator.sequence(transition, old_frames, frames,
+                                               (self.deck.KEY_ROWS, self.deck.KEY_COLS), self.transition_time)
+        except Exception as e:
+            logger.error("Cannot build %s transition on %s: %s", transition, self.name, e)
+            sequence = []
 
-        # Query size
-        key_w, key_h = self.deck.key_image_format()["size"]
-        with Image.open(io.BytesIO(png_data)).convert("RGBA") as icon:
-            icon = icon.resize((key_w, key_h), Image.LANCZOS)
+        async def show(step_frames: List[bytes]):
+            for key_index, frame in enumerate(step_frames):
+                self._send_key(key_index, frame)
+            # The next step is only due once this one is on the device; late steps are dropped
+            await self.writer.drain()
 
-            # Do your partial invert logic
-            r, g, b, alpha = icon.split()
-            rgb = Image.merge("RGB", (r, g, b))
-            rgb_inverted = ImageChops.invert(rgb)
-            icon_inverted = Image.merge("RGBA", (*rgb_inverted.split(), alpha))
+        with tracer.span("transition", kind=transition, steps=len(sequence)):
+            await animator.play(sequence, show, self.transition_time, cancelled=lambda: not self.attached)
+        final_frames = self._transition_frames
+        self._transition = self._transition_page = self._transition_frames = None
+        for key_index, frame in enumerate(final_frames):
+            self._send_key(key_index, frame)
+        await self.writer.drain()
 
-            final_img = Image.new("RGB", (key_w, key_h), color="black")
-            final_img.paste(icon_inverted, mask=icon_inverted.split()[3])
+    def cancel_transition(self):
+        if self._transition is not None:
+            self._transition.cancel()
+        self._transition = self._transition_page = self._transition_frames = None
 
-            final_bytes = io.BytesIO()
-            final_img.save(final_bytes, format="JPEG")
-            self.deck.set_key_image(key_index, final_bytes.getvalue())
+    async def finish_transition(self):
+        """
+        Wait for the page transition playing now, if any, to show its final frames.
+        """
+        task = self._transition
+        if task is not None:
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    raise
+
+    def animate_key(self, key_index: int, frame: bytes) -> bool:
+        """
+        Show 'frame' on a key, crossfading from the key's current frame in the
+        background. Without a current frame (or transitions) it is pushed as is.
+        Returns True if the key will change.
+        """
+        running = self._key_animations.get(key_index)
+        if running is not None and running[1] == frame:
+            return False
+        previous = self._frames.get(key_index)
+        if (self.state_transition != "fade" or previous is None or previous == frame or not self.attached
+                or self._transition_frames is not None):
+            return self.push_key_image(key_index, frame)
+        if running is not None:
+            # Carry on from whatever step the previous crossfade got to
+            running[0].cancel()
+        task = asyncio.create_task(self._crossfade_key(key_index, previous, frame))
+        self._key_animations[key_index] = (task, frame)
+        return True
+
+    async def _crossfade_key(self, key_index: int, previous: bytes, frame: bytes):
+        try:
+            sequence = await animator.sequence("fade", [previous], [frame], (1, 1), self.state_transition_time)
+
+            async def show(step_frames: List[bytes]):
+                self._send_key(key_index, step_frames[0])
+                await self.writer.drain()
+
+            await animator.play(sequence, show, self.state_transition_time, cancelled=lambda: not self.attached)
+        except asyncio.CancelledError:
+            # Superseded; whoever cancelled us draws the key
+            raise
+        except Exception as e:
+            logger.error("Crossfade of key %s on %s failed: %s", key_index, self.name, e)
+        if self._key_animations.get(key_index, (None,))[0] is asyncio.current_task():
+            del self._key_animations[key_index]
+        self.push_key_image(key_index, frame)
+
+    def cancel_key_animations(self):
+        for task, _ in self._key_animations.values():
+            task.cancel()
+        self._key_animations.clear()
+
+    async def render_strip(self, page: Page):
+        """
+        Show the page's LED on the touchscreen, or blank whatever the previous page left there.
+        """
+        if self.strip_compositor is None:
+            return
+        if page.led is not None:
+            await page.led.render()
+        else:
+            await self.strip_compositor.clear()
+
+    def request_key_render(self, row: int, col: int):
+        """
+        Have the scheduler redraw one key of the current page on its next tick.
+        """
+        if self.current_page is None:
+            return
+        button = self.current_page.button(row, col)
+        if button is not None:
+            self.scheduler.mark_dirty(button)
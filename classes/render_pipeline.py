@@ -0,0 +1,196 @@
+# file: classes/render_pipeline.py
+import asyncio
+import io
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from logger import get_logger
+from tracing import tracer
+from .icon_cache import INVERT, IconCache, icon_cache, rasterize_icon_batch
+from .text_render import draw_title
+
+logger = get_logger(__name__)
+
+
+def encode_blank(size: Tuple[int, int]) -> bytes:
+    """
+    JPEG bytes for an all-black key of the given size.
+    """
+    from PIL import Image
+
+    blank_img = Image.new("RGB", tuple(size), "black")
+    blank_bytes_io = io.BytesIO()
+    blank_img.save(blank_bytes_io, format="JPEG")
+    return blank_bytes_io.getvalue()
+
+
+class RenderPipeline:
+    """
+    Runs SVG rasterization and JPEG encoding on a worker pool so the asyncio
+    event loop stays free to handle key, dial and touch callbacks.
+    Finished frames are stored in the shared IconCache; cache hits never leave the loop.
+    Misses requested together are batched into one pool job per worker.
+    """
+    def __init__(self, workers: int = 2, use_processes: bool = False, cache: IconCache = icon_cache):
+        self.cache = cache
+        self.workers = workers
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        # Renders currently on the pool, so identical requests share one job
+        self._in_flight: Dict[tuple, asyncio.Future] = {}
+        # Misses waiting to be submitted at the end of this loop iteration
+        self._batch: List[Tuple[Tuple[str, str], Tuple[int, int], asyncio.Future]] = []
+        self._blank_frames: Dict[Tuple[int, int], bytes] = {}
+
+    def configure(self, workers: Optional[int] = None, use_processes: Optional[bool] = None):
+        """
+        Change the pool size or type. The old pool finishes its queued work in the background.
+        """
+        if workers is not None:
+            self.workers = max(1, workers)
+        if use_processes is not None:
+            self.use_processes = use_processes
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                # multiprocessing is only imported when processes are asked for
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render")
+            logger.debug("Render pipeline started with %s %s workers", self.workers, 'process' if self.use_processes else 'thread')
+        return self._executor
+
+    async def render_icon(self, svg_path: str, size: Tuple[int, int], transform: str = INVERT) -> Optional[bytes]:
+        """
+        Await the device-ready frame for an icon, or None if the icon is missing.
+        """
+        frame, key = self.cache.lookup(svg_path, size, transform)
+        if frame is not None or key is None:
+            return frame
+
+        future = self._in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            # key[0] is the resolved file, even when svg_path was an icon id
+            self._queue(loop, (key[0], transform), tuple(size), future)
+        # Shield the shared job so one cancelled caller does not cancel it for everyone
+        frame = await asyncio.shield(future)
+        self.cache.put(key, frame)
+        return frame
+
+    def _queue(self, loop: asyncio.AbstractEventLoop, item: Tuple[str, str], size: Tuple[int, int], future: asyncio.Future):
+        """
+        Collect every miss requested during this loop iteration (e.g. all keys of
+        a page being rendered) so they are rasterized as a few batched jobs.
+        """
+        if not self._batch:
+            loop.call_soon(self._flush)
+        self._batch.append((item, size, future))
+
+    def _flush(self):
+        batch, self._batch = self._batch, []
+        by_size: Dict[Tuple[int, int], List[Tuple[Tuple[str, str], asyncio.Future]]] = {}
+        for item, size, future in batch:
+            by_size.setdefault(size, []).append((item, future))
+
+        for size, jobs in by_size.items():
+            # One chunk per worker keeps the whole pool busy
+            chunk_size = -(-len(jobs) // self.workers)
+            for start in range(0, len(jobs), chunk_size):
+                chunk = jobs[start:start + chunk_size]
+                items = [item for item, _ in chunk]
+                futures = [future for _, future in chunk]
+                submitted = time.perf_counter_ns()
+                try:
+                    job = asyncio.wrap_future(self.executor.submit(rasterize_icon_batch, items, size))
+                except RuntimeError as e:  # pool already shut down
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                job.add_done_callback(lambda done, futures=futures, submitted=submitted: self._resolve(done, futures, submitted))
+
+    @staticmethod
+    def _resolve(job: asyncio.Future, futures: List[asyncio.Future], submitted: int):
+        # Measured here as well, since spans inside worker processes never reach us
+        tracer.record("render_batch", time.perf_counter_ns() - submitted, submitted, {"icons": len(futures)})
+        if job.cancelled():
+            for future in futures:
+                future.cancel()
+            return
+        if job.exception() is not None:
+            results = [job.exception()] * len(futures)
+        else:
+            results = job.result()
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def blank_frame(self, size: Tuple[int, int]) -> bytes:
+        size = tuple(size)
+        frame = self._blank_frames.get(size)
+        if frame is None:
+            # Also kept in the icon cache, so it is persisted with the first page (see frame_store.py)
+            frame = self.cache.get(("blank", size))
+            if frame is None:
+                loop = asyncio.get_running_loop()
+                frame = await loop.run_in_executor(self.executor, encode_blank, size)
+                self.cache.put(("blank", size), frame)
+            self._blank_frames[size] = frame
+        return frame
+
+    async def render_titled(self, svg_path: Optional[str], size: Tuple[int, int], title: str,
+                            position: Optional[str] = None, transform: str = INVERT) -> Optional[bytes]:
+        """
+        The icon's frame (or a blank key) with 'title' drawn over it. Composites are
+        cached next to the icons, and a new title is drawn over the cached icon frame,
+        so changing a label never rasterizes the SVG again.
+        """
+        size = tuple(size)
+        if svg_path:
+            icon_key = self.cache.key_for(svg_path, size, transform)
+            if icon_key is None:
+                logger.error("Missing icon: %s", svg_path)
+                return None
+        else:
+            icon_key = ("blank", size)
+        key = (*icon_key, "title", title, position)
+        frame = self.cache.get(key)
+        if frame is not None:
+            return frame
+
+        base = await self.render_icon(svg_path, size, transform) if svg_path else await self.blank_frame(size)
+        if base is None:
+            return None
+        loop = asyncio.get_running_loop()
+        # Atlas hits are memoryviews of the mapped file, which a process pool cannot pickle
+        frame = await loop.run_in_executor(self.executor, draw_title, bytes(base), title, position)
+        self.cache.put(key, frame)
+        return frame
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+render_pipeline = RenderPipeline(
+    workers=int(os.environ.get("STREAMDECK_RENDER_WORKERS", "2")),
+    use_processes=os.environ.get("STREAMDECK_RENDER_PROCESSES", "0") == "1",
+)
@@ -0,0 +1,91 @@
+# file: classes/render_scheduler.py
+import asyncio
+import time
+from typing import Dict, Optional
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RenderScheduler:
+    """
+    Collects dirty marks from controls and redraws them in one batched pass per
+    tick, at most max_fps ticks per second. However often the state changes,
+    the device never sees more than max_fps rounds of writes.
+    Controls are anything with an async render(); their .super is the page they belong to.
+    """
+    def __init__(self, manager, max_fps: float = 30.0):
+        self.manager = manager
+        self.max_fps = max_fps
+        self._dirty: Dict[int, object] = {}  # id -> control, in marking order
+        self._page_dirty = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_flush = 0.0
+        self.marks = 0
+        self.flushes = 0
+
+    def mark_dirty(self, control):
+        self.marks += 1
+        self._dirty[id(control)] = control
+        self._wake()
+
+    def mark_page_dirty(self):
+        self.marks += 1
+        self._page_dirty = True
+        self._wake()
+
+    def _wake(self):
+        # Start lazily on the first mark, so nothing has to remember to start us
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            delay = self._last_flush + 1.0 / self.max_fps - time.monotonic()
+            if delay > 0:
+                # Anything marked while we wait is folded into this same flush
+                await asyncio.sleep(delay)
+            self._last_flush = time.monotonic()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception("Render flush failed: %s", e)
+
+    async def flush(self):
+        """
+        Render everything marked so far, right now.
+        """
+        dirty, self._dirty = list(self._dirty.values()), {}
+        page_dirty, self._page_dirty = self._page_dirty, False
+        page = self.manager.current_page
+        if page is None or (not dirty and not page_dirty):
+            return
+        self.flushes += 1
+
+        renders = []
+        covered = set()
+        if page_dirty:
+            renders.append(self.manager.render_page(page))
+            # A full page render already covers that page's buttons
+            covered = {id(button) for _, _, button in page.iter_buttons()}
+        for control in dirty:
+            # Controls of a page we navigated away from are simply dropped
+            if getattr(control, "super", None) is not page or id(control) in covered:
+                continue
+            renders.append(control.render())
+        await asyncio.gather(*renders)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,81 @@
+# file: classes/rotation_aggregator.py
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class AccelerationCurve:
+    """
+    Scales a batch of dial ticks by how fast the dial was spun.
+    Below 'threshold' ticks per second nothing changes; above it the step grows
+    linearly with 'gain' per extra threshold's worth of speed, up to 'max_multiplier'.
+    """
+    def __init__(self, threshold: float = 15.0, gain: float = 0.5, max_multiplier: float = 4.0):
+        self.threshold = threshold
+        self.gain = gain
+        self.max_multiplier = max_multiplier
+
+    def multiplier(self, ticks_per_second: float) -> float:
+        if ticks_per_second <= self.threshold:
+            return 1.0
+        extra = (ticks_per_second - self.threshold) / self.threshold
+        return min(self.max_multiplier, 1.0 + self.gain * extra)
+
+    def apply(self, steps: int, elapsed: float) -> int:
+        speed = abs(steps) / elapsed if elapsed > 0 else 0.0
+        scaled = round(steps * self.multiplier(speed))
+        return scaled if scaled != 0 else steps
+
+
+class RotationAggregator:
+    """
+    Merges the ticks of one dial that arrive within 'window' seconds into a single
+    call of 'dispatch' with the summed (and optionally accelerated) step count.
+    Calls are serialized: ticks that arrive while an action is still running are
+    folded into the next call instead of starting a second one.
+    """
+    def __init__(self, dispatch: Callable[[int], Awaitable[Any]], window: float = 0.05,
+                 acceleration: Optional[AccelerationCurve] = None):
+        self._dispatch = dispatch
+        self.window = window
+        self.acceleration = acceleration
+        self._pending = 0
+        self._first_tick: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, steps: int):
+        """
+        Record signed dial ticks (positive = right). Never blocks.
+        """
+        if self._first_tick is None:
+            self._first_tick = time.monotonic()
+        self._pending += steps
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._first_tick is not None:
+            await asyncio.sleep(self.window)
+            steps, self._pending = self._pending, 0
+            elapsed = max(self.window, time.monotonic() - self._first_tick)
+            self._first_tick = None
+            if steps == 0:
+                # Left and right ticks cancelled out
+                continue
+            if self.acceleration is not None:
+                steps = self.acceleration.apply(steps, elapsed)
+            try:
+                await self._dispatch(steps)
+            except Exception as e:
+                logger.error("Dial rotation handler failed: %s", e)
+
+    def cancel(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._task = None
+        self._pending = 0
+        self._first_tick = None
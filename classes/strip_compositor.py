@@ -0,0 +1,179 @@
+# file: classes/strip_compositor.py
+import asyncio
+import io
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from logger import get_logger
+from tracing import tracer
+from .icon_cache import INVERT, icon_cache
+from .render_pipeline import render_pipeline
+from .text_render import text_renderer
+
+logger = get_logger(__name__)
+
+# (x, y, width, height) on the touchscreen
+Region = Tuple[int, int, int, int]
+
+
+class StripUpdate(NamedTuple):
+    region: Region
+    image: Optional[str]  # None blanks the region
+    transform: str = INVERT
+    title: Optional[str] = None
+    title_position: Optional[str] = None
+
+
+def compose_tile(icon_frame: Optional[bytes], size: Tuple[int, int], title: Optional[str] = None,
+                 title_position: Optional[str] = None):
+    """
+    Center a square icon frame on a black tile of 'size' and draw the title over it.
+    Returns (RGB image for the framebuffer, JPEG bytes for the device).
+    """
+    from PIL import Image
+
+    tile = Image.new("RGB", size, "black")
+    if icon_frame is not None:
+        with Image.open(io.BytesIO(icon_frame)) as icon:
+            tile.paste(icon.convert("RGB"), ((size[0] - icon.width) // 2, (size[1] - icon.height) // 2))
+    if title:
+        text_renderer.draw(tile, title, title_position)
+    with tracer.span("encode"):
+        encoded = io.BytesIO()
+        tile.save(encoded, format="JPEG")
+    return tile, encoded.getvalue()
+
+
+class StripCompositor:
+    """
+    Owns the Stream Deck+ touchscreen. Keeps a framebuffer of the whole strip
+    and remembers which tile each region shows, so a redraw only sends the
+    regions whose tile changed, each through the device's partial update.
+    Composed tiles are cached per (icon, region size, title). Writes go through
+    'writer' (a DeviceWriter) if given, otherwise straight to the deck.
+    """
+    def __init__(self, deck, writer=None, max_tiles: int = 64):
+        self.deck = deck
+        self.writer = writer
+        self.size = (deck.TOUCHSCREEN_PIXEL_WIDTH, deck.TOUCHSCREEN_PIXEL_HEIGHT)
+        # Made on the first draw, so a strip that stays blank never imports PIL
+        self._framebuffer = None
+        self.max_tiles = max_tiles
+        self._tiles: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # Tile key currently on the device for each region
+        self._shown: Dict[Region, tuple] = {}
+        self.writes = 0
+
+    @property
+    def framebuffer(self):
+        if self._framebuffer is None:
+            from PIL import Image
+
+            self._framebuffer = Image.new("RGB", self.size, "black")
+        return self._framebuffer
+
+    def regions(self, count: int) -> List[Region]:
+        """
+        Split the strip into 'count' equal columns, e.g. one per dial.
+        """
+        width = self.size[0] // count
+        return [(index * width, 0, width, self.size[1]) for index in range(count)]
+
+    def _tile_key(self, update: StripUpdate) -> tuple:
+        _, _, width, height = update.region
+        # Square icons, as tall as the strip
+        icon_key = icon_cache.key_for(update.image, (height, height), update.transform) if update.image else None
+        return icon_key, width, height, update.title or None, update.title_position
+
+    async def _tile(self, key: tuple, update: StripUpdate):
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            return tile
+        icon_key, width, height, title, title_position = key
+        frame = None
+        if icon_key is not None:
+            frame = await render_pipeline.render_icon(update.image, (height, height), update.transform)
+            # Atlas hits are memoryviews of the mapped file, which a process pool cannot pickle
+            frame = bytes(frame) if frame is not None else None
+        loop = asyncio.get_running_loop()
+        tile = await loop.run_in_executor(render_pipeline.executor, compose_tile, frame, (width, height),
+                                          title, title_position)
+        self._tiles[key] = tile
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+        return tile
+
+    async def compose(self, updates: Sequence[StripUpdate]) -> int:
+        """
+        Show every update; one without an icon or title blanks its region.
+        Only regions whose tile differs from what the device shows are written.
+        Returns the number of device writes.
+        """
+        changed = []
+        for update in updates:
+            key = self._tile_key(update)
+            if self._shown.get(update.region) != key:
+                changed.append((update.region, key, update))
+        if not changed:
+            return 0
+
+        tiles = await asyncio.gather(*(self._tile(key, update) for _, key, update in changed))
+        written = 0
+        for (region, key, _), (tile_image, tile_bytes) in zip(changed, tiles):
+            # Another render may have put this tile up while we were composing
+            if self._shown.get(region) == key:
+                continue
+            x, y, width, height = region
+            self.framebuffer.paste(tile_image, (x, y))
+            self._write(tile_bytes, region, key)
+            self._shown[region] = key
+            written += 1
+        self.writes += written
+        return written
+
+    def _write(self, frame: bytes, region: Region, key: Optional[tuple] = None):
+        if self.writer is not None:
+            def forget(_error, region=region, key=key):
+                # Runs on the loop; leave a tile composed since this write alone
+                if key is None:
+                    self._shown.clear()
+                elif self._shown.get(region) == key:
+                    self._shown.pop(region, None)
+
+            self.writer.submit(self._write_now, frame, region, on_error=forget)
+        else:
+            self._write_now(frame, region)
+
+    def _write_now(self, frame: bytes, region: Region):
+        with tracer.span("touch_write", region=region):
+            self.deck.set_touchscreen_image(frame, *region)
+        tracer.pixels_written()
+
+    async def clear(self) -> int:
+        """
+        Blank every region that is currently showing something.
+        """
+        return await self.compose([StripUpdate(region, None) for region, key in self._shown.items()
+                                   if key[0] is not None or key[3] is not None])
+
+    def push_full(self):
+        """
+        Send the whole framebuffer in one write, e.g. after the device was reset.
+        """
+        encoded = io.BytesIO()
+        self.framebuffer.save(encoded, format="JPEG")
+        self._write(encoded.getvalue(), (0, 0, *self.size))
+        self.writes += 1
+
+    def showing(self) -> bool:
+        """
+        True if the framebuffer holds anything but black, i.e. a reset strip would look different.
+        """
+        return self._framebuffer is not None and self._framebuffer.getbbox() is not None
+
+    def invalidate(self):
+        """
+        Forget what the device shows, so the next compose re-sends every region.
+        """
+        self._shown.clear()
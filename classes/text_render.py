@@ -0,0 +1,201 @@
+# file: classes/text_render.py
+"""
+Title text for keys and touch-strip regions.
+
+Fonts are loaded once per pixel size, every glyph is rasterized once per font
+into an alpha mask, and the layout of a title (line breaks, glyph positions) is
+cached per text, font size and width. Drawing a title is then just pasting
+cached masks over an already rendered icon.
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+TITLE_POSITIONS = ("top", "middle", "bottom")
+DEFAULT_TITLE_POSITION = "bottom"
+ELLIPSIS = "…"
+
+
+class Glyph(NamedTuple):
+    mask: object  # PIL "L" image, or None for blank glyphs such as spaces
+    offset: Tuple[int, int]  # from the pen position (left, top of the line) to the mask
+    advance: float
+
+
+class TextLayout(NamedTuple):
+    # (glyph, x, y) with x, y relative to the top left corner of the text block
+    placements: List[Tuple[Glyph, int, int]]
+    width: int
+    height: int
+
+
+class TextRenderer:
+    """
+    Lays out and draws short titles from cached glyph masks.
+    Safe to use from several render worker threads.
+    """
+    def __init__(self, font_path: Optional[str] = None, max_layouts: int = 1024):
+        # Any TrueType/OpenType file; Pillow's bundled font otherwise
+        self.font_path = font_path or os.environ.get("STREAMDECK_TITLE_FONT") or None
+        self.max_layouts = max_layouts
+        self._fonts: Dict[int, object] = {}
+        self._glyphs: Dict[Tuple[int, str], Glyph] = {}
+        self._layouts: "OrderedDict[tuple, TextLayout]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.glyph_misses = 0
+        self.layout_hits = 0
+        self.layout_misses = 0
+
+    def font(self, size: int):
+        font = self._fonts.get(size)
+        if font is None:
+            from PIL import ImageFont
+
+            with self._lock:
+                font = self._fonts.get(size)
+                if font is None:
+                    try:
+                        font = ImageFont.truetype(self.font_path, size) if self.font_path else ImageFont.load_default(size)
+                    except OSError as e:
+                        logger.error("Cannot load title font %s: %s", self.font_path, e)
+                        font = ImageFont.load_default(size)
+                    self._fonts[size] = font
+        return font
+
+    def glyph(self, char: str, size: int) -> Glyph:
+        glyph = self._glyphs.get((size, char))
+        if glyph is not None:
+            return glyph
+        from PIL import Image, ImageDraw
+
+        with self._lock:
+            font = self.font(size)
+            left, top, right, bottom = font.getbbox(char)
+            mask = None
+            if right > left and bottom > top:
+                mask = Image.new("L", (right - left, bottom - top), 0)
+                ImageDraw.Draw(mask).text((-left, -top), char, font=font, fill=255)
+            glyph = Glyph(mask, (left, top), font.getlength(char))
+            self._glyphs[(size, char)] = glyph
+            self.glyph_misses += 1
+        return glyph
+
+    def _width(self, text: str, size: int) -> float:
+        return sum(self.glyph(char, size).advance for char in text)
+
+    def _fit(self, text: str, size: int, max_width: int) -> str:
+        """
+        'text' shortened with an ellipsis until it fits 'max_width'.
+        """
+        if self._width(text, size) <= max_width:
+            return text
+        while text and self._width(text + ELLIPSIS, size) > max_width:
+            text = text[:-1]
+        return text.rstrip() + ELLIPSIS
+
+    def _wrap(self, text: str, size: int, max_width: int, max_lines: int) -> List[str]:
+        lines: List[str] = []
+        for paragraph in text.split("\n"):
+            line = ""
+            for word in paragraph.split():
+                candidate = f"{line} {word}" if line else word
+                if not line or self._width(candidate, size) <= max_width:
+                    line = candidate
+                else:
+                    lines.append(line)
+                    line = word
+            lines.append(line)
+        if len(lines) > max_lines:
+            lines = lines[:max_lines - 1] + [" ".join(lines[max_lines - 1:])]
+        return [self._fit(line, size, max_width) for line in lines]
+
+    def layout(self, text: str, size: int, max_width: int, max_lines: int = 2) -> TextLayout:
+        key = (text, size, max_width, max_lines)
+        with self._lock:
+            layout = self._layouts.get(key)
+            if layout is not None:
+                self._layouts.move_to_end(key)
+                self.layout_hits += 1
+                return layout
+            self.layout_misses += 1
+            ascent, descent = self.font(size).getmetrics()
+            line_height = ascent + descent
+            placements = []
+            lines = self._wrap(text, size, max_width, max_lines)
+            widths = [round(self._width(line, size)) for line in lines]
+            width = max(widths, default=0)
+            for index, (line, line_width) in enumerate(zip(lines, widths)):
+                # Every line is centred within the block
+                pen_x, pen_y = (width - line_width) / 2, index * line_height
+                for char in line:
+                    glyph = self.glyph(char, size)
+                    if glyph.mask is not None:
+                        placements.append((glyph, round(pen_x) + glyph.offset[0], pen_y + glyph.offset[1]))
+                    pen_x += glyph.advance
+            layout = TextLayout(placements, width, len(lines) * line_height)
+            self._layouts[key] = layout
+            while len(self._layouts) > self.max_layouts:
+                self._layouts.popitem(last=False)
+        return layout
+
+    @staticmethod
+    def font_size_for(height: int) -> int:
+        return max(9, height // 8)
+
+    def draw(self, image, text: str, position: Optional[str] = None, font_size: Optional[int] = None):
+        """
+        Draw 'text' onto an RGB image in place, white with a dark shadow so it stays
+        readable on any icon. position is "top", "middle" or "bottom".
+        """
+        position = position or DEFAULT_TITLE_POSITION
+        if position not in TITLE_POSITIONS:
+            raise ValueError(f"Unknown title position {position!r}")
+        width, height = image.size
+        size = font_size or self.font_size_for(height)
+        margin = max(2, height // 30)
+        layout = self.layout(text, size, width - 2 * margin)
+        left = (width - layout.width) // 2
+        if position == "top":
+            top = margin
+        elif position == "middle":
+            top = (height - layout.height) // 2
+        else:
+            top = height - layout.height - margin
+        for colour, shift in (("black", 1), ("white", 0)):
+            for glyph, x, y in layout.placements:
+                image.paste(colour, (left + x + shift, top + y + shift), glyph.mask)
+        return image
+
+    def stats(self) -> dict:
+        return {
+            "fonts": len(self._fonts),
+            "glyphs": len(self._glyphs),
+            "glyph_misses": self.glyph_misses,
+            "layouts": len(self._layouts),
+            "layout_hits": self.layout_hits,
+            "layout_misses": self.layout_misses,
+        }
+
+
+# Shared by every render worker thread in this process
+text_renderer = TextRenderer()
+
+
+def draw_title(frame: bytes, title: str, position: Optional[str] = None) -> bytes:
+    """
+    Decode a device-ready frame, draw 'title' over it and encode it again.
+    Module level so process pools can run it.
+    """
+    from PIL import Image
+
+    from .icon_cache import _encode
+
+    with Image.open(io.BytesIO(frame)) as decoded:
+        image = decoded.convert("RGB")
+    return _encode(text_renderer.draw(image, title, position))
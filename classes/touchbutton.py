@@ -1,15 +1,23 @@
+# file: classes/touchbutton.py
 from typing import List, Callable, Optional, Dict, Any, Tuple
-from .base import InteractableItem, ItemState, VisibleItem
-from logger import logger
+
+from logger import get_logger
+from .base import ItemState, VisibleItem, call_action
+from .icon_cache import tinted
+from .strip_compositor import StripUpdate
+
+logger = get_logger(__name__)
 
 
 class TouchButton(VisibleItem):
     """
     Represents a segment of the LED that manages its state and interactions independently.
     """
+    __slots__ = ("led", "size", "_tap_function", "_tap_input")
 
-    def __init__(self,led, position: Tuple[int, int], size: Tuple[int, int], page, item_states: List[ItemState]):
+    def __init__(self, led, position: Tuple[int, int], size: Tuple[int, int], page, item_states: List[ItemState]):
         """
+        :param led: The Led whose touchscreen this button is a region of.
         :param position: (x, y) position of the TouchButton within the LED.
         :param size: (width, height) of the TouchButton's interactive region.
         :param page: Parent page or container.
@@ -19,40 +27,39 @@ class TouchButton(VisibleItem):
         super().__init__(position, page, item_states)
         self.size = size
         self._tap_function: Optional[Callable[..., Any]] = None
+        self._tap_input: Optional[Dict] = None
+
+    @property
+    def region(self) -> Tuple[int, int, int, int]:
+        return (*self.position, *self.size)
 
     def set_tap_function(self, func: Callable[..., Any], func_input: Optional[Dict] = None):
         self._tap_function = func
-        self._async_function_input = func_input
+        self._tap_input = func_input
 
     async def on_tap(self, x=None, y=None):
         if x is not None and y is not None:
             local_x = x - self.position[0]
             local_y = y - self.position[1]
-            logger.info(f"Tapped TouchButton at local coordinates ({local_x}, {local_y})")
+            logger.info("Tapped TouchButton at local coordinates (%s, %s)", local_x, local_y)
         else:
-            logger.info(f"Tapped TouchButton at {self.position} with size {self.size}")
+            logger.info("Tapped TouchButton at %s with size %s", self.position, self.size)
 
         await self.on_trigger()
         if self._tap_function:
-            if self._async_function_input:
-                await self._tap_function(x=x, y=y, **self._async_function_input)
-            else:
-                await self._tap_function(x=x, y=y)
+            await call_action(self._tap_function, x=x, y=y, **(self._tap_input or {}))
 
-    async def render(self):
+    def update(self) -> StripUpdate:
         """
-        Renders this TouchButton into its section of the LED.
+        What the strip compositor should show in this button's region.
         """
-        current_state_image_path = self.states.states[self.current_state_index].image
-        if not current_state_image_path:
-            return
-
-        from PIL import Image
-        import os
+        state = self.states[self.current_state_index] if self.states else None
+        if state is None:
+            return StripUpdate(self.region, None)
+        return StripUpdate(self.region, state.image, tinted(state.tint), state.title, state.title_position)
 
-        if not os.path.exists(current_state_image_path):
-            logger.error(f"Missing image for TouchButton: {current_state_image_path}")
-            return
-
-        button_image = Image.open(current_state_image_path).resize(self.size, Image.LANCZOS)
-        self.led.image.paste(button_image, self.position)
+    async def render(self):
+        """
+        Redraw this TouchButton's region of the LED; nothing is sent if it already shows this state.
+        """
+        await self.led.render([self])
@@ -0,0 +1,102 @@
+# file: compile_icons.py
+"""
+Pre-renders the Icons/ directory into one memory-mapped tile atlas per key format.
+
+    python compile_icons.py                      # every icon, every known device format
+    python compile_icons.py --size 120x120       # every icon, one format
+    python compile_icons.py --config config/pages.json --size 120x120
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+from typing import List, Set, Tuple
+
+from classes.icon_atlas import DEFAULT_ATLAS_DIR, atlas_path_for, compile_atlas
+from classes.page import BACK_ICON
+from classes.icon_catalog import icon_catalog
+from classes.page_config import ConfigError, config_icons, load_config
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+ICON_REFERENCE = re.compile(r"""["'](Icons/[^"']+?\.svg)["']""")
+
+
+def parse_size(value: str) -> Tuple[int, int]:
+    try:
+        key_w, key_h = value.lower().split("x")
+        return int(key_w), int(key_h)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected WIDTHxHEIGHT, got {value!r}")
+
+
+def device_key_sizes() -> List[Tuple[int, int]]:
+    """
+    Every distinct key size among the StreamDeck models that accept JPEG key images.
+    """
+    from StreamDeck.Devices import StreamDeck as base
+    import StreamDeck.Devices as devices
+    import importlib
+    import pkgutil
+
+    sizes: Set[Tuple[int, int]] = set()
+    for module_info in pkgutil.iter_modules(devices.__path__):
+        module = importlib.import_module(f"{devices.__name__}.{module_info.name}")
+        for obj in vars(module).values():
+            if isinstance(obj, type) and issubclass(obj, base.StreamDeck) and obj is not base.StreamDeck:
+                if obj.KEY_PIXEL_WIDTH and obj.KEY_IMAGE_FORMAT == "JPEG":
+                    sizes.add((obj.KEY_PIXEL_WIDTH, obj.KEY_PIXEL_HEIGHT))
+    return sorted(sizes)
+
+
+def referenced_icons(paths: List[str]) -> Set[str]:
+    """
+    Collect every "Icons/....svg" string literal in the given files.
+    """
+    icons: Set[str] = set()
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            icons.update(ICON_REFERENCE.findall(f.read()))
+    return icons
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pack SVG icons into per-device tile atlases.")
+    parser.add_argument("--icons", default="Icons", help="Directory of SVG icons (default: Icons)")
+    parser.add_argument("--out", default=DEFAULT_ATLAS_DIR, help=f"Output directory (default: {DEFAULT_ATLAS_DIR})")
+    parser.add_argument("--size", type=parse_size, action="append",
+                        help="Key size as WIDTHxHEIGHT; repeatable. Defaults to every known device format.")
+    parser.add_argument("--referenced-by", action="append", metavar="FILE",
+                        help="Only compile icons referenced by this file; repeatable.")
+    parser.add_argument("--config", action="append", metavar="FILE",
+                        help="Only compile icons used by this page config; repeatable.")
+    parser.add_argument("--workers", type=int, default=None, help="Rasterizer processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if args.referenced_by or args.config:
+        # The back arrow is added by Page.create_child, so no config mentions it
+        icons = referenced_icons(args.referenced_by or []) | {BACK_ICON}
+        for path in args.config or []:
+            try:
+                # Configs may name icons by id; the atlas is indexed by path
+                icons |= {icon_catalog.resolve(icon).path for icon in config_icons(load_config(path))}
+            except ConfigError as e:
+                logger.error("Invalid page config: %s", e)
+                return 1
+        svg_paths = sorted(icons)
+    else:
+        svg_paths = sorted(glob.glob(os.path.join(args.icons, "*.svg")))
+    if not svg_paths:
+        logger.error("No icons to compile.")
+        return 1
+
+    sizes = args.size or device_key_sizes()
+    for size in sizes:
+        compile_atlas(svg_paths, size, atlas_path_for(size, directory=args.out), workers=args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# file: functions/action_runner.py
+import asyncio
+import time
+from typing import Dict, NamedTuple, Optional, Sequence, Set, Tuple
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ActionResult(NamedTuple):
+    returncode: Optional[int]  # None if the command was detached, failed to start or timed out
+    stdout: str = ""
+
+
+class ActionMetrics:
+    """
+    Latency and exit-status counters for one named action.
+    """
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.deduplicated = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_returncode: Optional[int] = None
+
+    def record(self, latency: float, returncode: Optional[int]):
+        self.runs += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.last_returncode = returncode
+        if returncode not in (0, None):
+            self.failures += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "deduplicated": self.deduplicated,
+            "mean_latency": self.total_latency / self.runs if self.runs else 0.0,
+            "max_latency": self.max_latency,
+            "last_returncode": self.last_returncode,
+        }
+
+
+class ActionRunner:
+    """
+    Runs external commands as asyncio subprocesses so no action can block the deck.
+    Each action name gets its own concurrency cap and timeout; an identical command
+    that is already running is joined instead of started again.
+    """
+    def __init__(self, timeout: float = 10.0, max_concurrent: int = 2):
+        self.timeout = timeout
+        self.max_concurrent = max_concurrent
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[Tuple[str, Tuple[str, ...]], asyncio.Task] = {}
+        self._metrics: Dict[str, ActionMetrics] = {}
+        # Waits on detached processes; the loop only keeps weak references to tasks
+        self._reapers: Set[asyncio.Task] = set()
+
+    def _stats(self, name: str) -> ActionMetrics:
+        stats = self._metrics.get(name)
+        if stats is None:
+            stats = self._metrics[name] = ActionMetrics()
+        return stats
+
+    async def run(self, name: str, argv: Sequence[str], timeout: Optional[float] = None,
+                  detach: bool = False, capture: bool = False, dedupe: bool = True) -> ActionResult:
+        """
+        Run argv (no shell) under the action 'name'.
+        :param timeout: Seconds before the command is killed (default: self.timeout).
+        :param detach: Return once the process has started, e.g. for GUI applications.
+        :param capture: Collect and return stdout.
+        :param dedupe: Join an identical command that is still running. Turn this off
+                       for commands that are not idempotent, such as toggles.
+        """
+        key = (name, tuple(argv))
+        if dedupe and key in self._in_flight:
+            self._stats(name).deduplicated += 1
+            return await asyncio.shield(self._in_flight[key])
+
+        task = asyncio.create_task(self._execute(name, list(argv), timeout, detach, capture))
+        if dedupe:
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _execute(self, name: str, argv: list, timeout: Optional[float], detach: bool, capture: bool) -> ActionResult:
+        semaphore = self._semaphores.get(name)
+        if semaphore is None:
+            semaphore = self._semaphores[name] = asyncio.Semaphore(self.max_concurrent)
+        stats = self._stats(name)
+
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *argv,
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE if capture else asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.DEVNULL if detach else asyncio.subprocess.PIPE,
+                )
+            except OSError as e:
+                logger.error("Action %s could not start %s: %s", name, argv[0], e)
+                stats.failures += 1
+                return ActionResult(None)
+
+            if detach:
+                stats.record(time.monotonic() - start, None)
+                # Reap the process whenever it exits so it does not linger as a zombie
+                reaper = asyncio.create_task(process.wait())
+                self._reapers.add(reaper)
+                reaper.add_done_callback(self._reapers.discard)
+                return ActionResult(None)
+
+            if timeout is None:
+                timeout = self.timeout
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                stats.timeouts += 1
+                stats.record(time.monotonic() - start, None)
+                logger.warning("Action %s timed out after %ss and was killed", name, timeout)
+                return ActionResult(None)
+
+            stats.record(time.monotonic() - start, process.returncode)
+            if process.returncode != 0:
+                logger.error("Action %s exited with %s: %s", name, process.returncode, stderr.decode(errors='replace').strip())
+            return ActionResult(process.returncode, stdout.decode(errors="replace") if stdout else "")
+
+    def metrics(self) -> Dict[str, dict]:
+        return {name: stats.as_dict() for name, stats in self._metrics.items()}
+
+
+# Shared by every action in functions/
+action_runner = ActionRunner()
@@ -0,0 +1,222 @@
+# file: functions/audio_backend.py
+import asyncio
+import re
+from typing import Callable, List, Optional, Tuple
+
+from logger import get_logger
+from .action_runner import action_runner
+
+logger = get_logger(__name__)
+
+# Turning the volume up never takes the sink past this many percent
+MAX_VOLUME = 100
+
+_PERCENT = re.compile(r"(\d+)%")
+_EVENT = re.compile(r"Event '(\w+)' on (\w+)")
+
+
+class AudioBackend:
+    """
+    Interface for controlling the default sink (output) and source (microphone).
+    Backends keep the current volume and mute state cached locally and call
+    every listener whenever it changes, so buttons can show it without polling.
+    """
+    def __init__(self):
+        self.sink_volume: Optional[int] = None  # percent
+        self.sink_muted: Optional[bool] = None
+        self.source_muted: Optional[bool] = None
+        self._listeners: List[Callable[['AudioBackend'], None]] = []
+
+    def add_listener(self, listener: Callable[['AudioBackend'], None]):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[['AudioBackend'], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self):
+        for listener in self._listeners:
+            try:
+                listener(self)
+            except Exception as e:
+                logger.error("Audio listener failed: %s", e)
+
+    def _update(self, sink_volume: Optional[int] = None, sink_muted: Optional[bool] = None,
+                source_muted: Optional[bool] = None):
+        before = (self.sink_volume, self.sink_muted, self.source_muted)
+        if sink_volume is not None:
+            self.sink_volume = sink_volume
+        if sink_muted is not None:
+            self.sink_muted = sink_muted
+        if source_muted is not None:
+            self.source_muted = source_muted
+        if (self.sink_volume, self.sink_muted, self.source_muted) != before:
+            self._notify()
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def change_volume(self, delta: int):
+        """
+        Change the default sink volume by 'delta' percent (negative = quieter).
+        A step up stops at MAX_VOLUME; a sink already above it is not turned up further.
+        """
+        raise NotImplementedError
+
+    async def toggle_source_mute(self):
+        raise NotImplementedError
+
+
+class PactlBackend(AudioBackend):
+    """
+    Talks to PulseAudio or PipeWire (via pipewire-pulse) through pactl.
+
+    One long-lived 'pactl subscribe' process reports sink/source/server changes,
+    after which the cached state is re-read. pactl has no interactive command
+    mode, so commands are exec'd directly (no shell) through the shared action
+    runner without blocking the event loop. Volume changes requested while one
+    is in flight are summed into the next command instead of queueing one
+    process per dial tick. Changes are sent as relative steps, so per-channel
+    balance and volumes above 100% survive; only a step up is shortened, using
+    the cached volume, so it stops at MAX_VOLUME.
+    """
+    def __init__(self, pactl: str = "pactl", refresh_delay: float = 0.02, timeout: float = 2.0):
+        super().__init__()
+        self.pactl = pactl
+        self.timeout = timeout
+        self.refresh_delay = refresh_delay
+        self._subscriber: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._refresh: Optional[asyncio.Task] = None
+        self._volume_delta = 0
+        self._volume_job: Optional[asyncio.Task] = None
+
+    async def _run(self, *args: str, dedupe: bool = True) -> Tuple[Optional[int], str]:
+        # Each pactl subcommand is its own action, so reads never queue behind writes
+        result = await action_runner.run(f"pactl {args[0]}", [self.pactl, *args],
+                                         timeout=self.timeout, capture=True, dedupe=dedupe)
+        return result.returncode, result.stdout
+
+    async def start(self):
+        if self._subscriber is not None:
+            return
+        try:
+            self._subscriber = await asyncio.create_subprocess_exec(
+                self.pactl, "subscribe",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        except OSError as e:
+            logger.error("Could not start '%s subscribe': %s", self.pactl, e)
+            return
+        self._reader = asyncio.create_task(self._read_events())
+        await self.refresh()
+
+    async def stop(self):
+        for task in (self._reader, self._refresh, self._volume_job):
+            if task is not None:
+                task.cancel()
+        if self._subscriber is not None and self._subscriber.returncode is None:
+            self._subscriber.terminate()
+            await self._subscriber.wait()
+        self._subscriber = None
+
+    async def _read_events(self):
+        while True:
+            line = await self._subscriber.stdout.readline()
+            if not line:
+                logger.warning("pactl subscribe exited; audio state will no longer update")
+                return
+            match = _EVENT.search(line.decode(errors="replace"))
+            if match and match.group(2) in ("sink", "source", "server"):
+                self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        # One change usually arrives as a burst of events; re-read the state once
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.create_task(self._delayed_refresh())
+
+    async def _delayed_refresh(self):
+        await asyncio.sleep(self.refresh_delay)
+        await self.refresh()
+
+    async def refresh(self):
+        """
+        Re-read volume and mute state from the server.
+        """
+        (_, volume), (_, sink_mute), (_, source_mute) = await asyncio.gather(
+            self._run("get-sink-volume", "@DEFAULT_SINK@"),
+            self._run("get-sink-mute", "@DEFAULT_SINK@"),
+            self._run("get-source-mute", "@DEFAULT_SOURCE@"),
+        )
+        percent = _PERCENT.search(volume)
+        self._update(
+            sink_volume=int(percent.group(1)) if percent else None,
+            sink_muted=("yes" in sink_mute) if sink_mute else None,
+            source_muted=("yes" in source_mute) if source_mute else None,
+        )
+
+    async def change_volume(self, delta: int):
+        self._volume_delta += delta
+        if self._volume_job is None or self._volume_job.done():
+            self._volume_job = asyncio.create_task(self._apply_volume())
+        await asyncio.shield(self._volume_job)
+
+    async def _apply_volume(self):
+        while self._volume_delta:
+            if self._volume_delta > 0 and self.sink_volume is None:
+                await self.refresh()
+                if self.sink_volume is None:
+                    logger.error("Sink volume unknown; ignoring a change of %+d%%", self._volume_delta)
+                    self._volume_delta = 0
+                    return
+            delta, self._volume_delta = self._volume_delta, 0
+            if delta > 0:
+                delta = min(delta, MAX_VOLUME - self.sink_volume)
+                if delta <= 0:
+                    continue
+            returncode, _ = await self._run("set-sink-volume", "@DEFAULT_SINK@", f"{delta:+d}%", dedupe=False)
+            if returncode == 0 and self.sink_volume is not None:
+                # Don't wait for the subscribe event, the next step up is clamped against this one
+                self._update(sink_volume=max(0, self.sink_volume + delta))
+
+    async def toggle_source_mute(self):
+        # Two quick toggles must both happen, so never merge them
+        await self._run("set-source-mute", "@DEFAULT_SOURCE@", "toggle", dedupe=False)
+
+
+class FakeAudioBackend(AudioBackend):
+    """
+    In-memory backend for tests and benchmarks. Records every command it receives.
+    """
+    def __init__(self, sink_volume: int = 50, sink_muted: bool = False, source_muted: bool = False):
+        super().__init__()
+        self.sink_volume = sink_volume
+        self.sink_muted = sink_muted
+        self.source_muted = source_muted
+        self.commands: List[Tuple[str, ...]] = []
+
+    async def change_volume(self, delta: int):
+        self.commands.append(("change_volume", delta))
+        if delta > 0:
+            delta = max(0, min(delta, MAX_VOLUME - self.sink_volume))
+        self._update(sink_volume=max(0, self.sink_volume + delta))
+
+    async def toggle_source_mute(self):
+        self.commands.append(("toggle_source_mute",))
+        self._update(source_muted=not self.source_muted)
+
+
+_backend: AudioBackend = PactlBackend()
+
+
+def get_audio_backend() -> AudioBackend:
+    return _backend
+
+
+def set_audio_backend(backend: AudioBackend):
+    global _backend
+    _backend = backend
@@ -1,27 +1,25 @@
 # file: functions/audio_functions.py
-import subprocess
+from logger import get_logger
+from .audio_backend import get_audio_backend
 
-from logger import logger
+logger = get_logger(__name__)
 
 
-def volume_up(step=5):
-    cmd = f"pactl set-sink-volume @DEFAULT_SINK@ +{step}%"
-    print(cmd)
-    subprocess.run(cmd, shell=True)
+async def volume_up(step=5):
+    logger.debug("Volume up %s%%", step)
+    await get_audio_backend().change_volume(step)
 
-def volume_down(step=5):
-    cmd = f"pactl set-sink-volume @DEFAULT_SINK@ -{step}%"
-    print(cmd)
-    subprocess.run(cmd, shell=True)
+async def volume_down(step=5):
+    logger.debug("Volume down %s%%", step)
+    await get_audio_backend().change_volume(-step)
 
-def control_volume(direction, step=5):
-    logger.info(f"Changing volume: {direction} {step}")
+async def control_volume(direction, step=5):
+    logger.info("Changing volume: %s %s", direction, step)
     if direction == "left":
-        volume_down(step)
+        await volume_down(step)
     elif direction == "right":
-        volume_up(step)
+        await volume_up(step)
 
-def toggle_mic():
-    cmd = "pactl set-source-mute @DEFAULT_SOURCE@ toggle"
-    print(cmd)
-    subprocess.run(cmd, shell=True)
+async def toggle_mic():
+    logger.debug("Toggling microphone mute")
+    await get_audio_backend().toggle_source_mute()
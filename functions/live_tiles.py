@@ -0,0 +1,89 @@
+# file: functions/live_tiles.py
+"""
+Built-in live tiles, available to page configs as a state's "live" name.
+Each factory returns a new LiveTile; the config shares one per name.
+"""
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from classes.live_tile import LiveTile
+from logger import get_logger
+from .audio_backend import get_audio_backend
+
+logger = get_logger(__name__)
+
+
+def _font(size: int):
+    from PIL import ImageFont
+
+    return ImageFont.load_default(size=size)
+
+
+def draw_text(text: str, size: Tuple[int, int]):
+    """
+    White text centred on a black key.
+    """
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", size, "black")
+    ImageDraw.Draw(image).text((size[0] / 2, size[1] / 2), text, fill="white", anchor="mm",
+                               font=_font(size[1] // 4))
+    return image
+
+
+def draw_gauge(percent: Optional[int], label: str, size: Tuple[int, int]):
+    """
+    A bar filled to 'percent' under a "label percent%" caption; None shows "--".
+    """
+    from PIL import Image, ImageDraw
+
+    width, height = size
+    image = Image.new("RGB", size, "black")
+    draw = ImageDraw.Draw(image)
+    text = f"{label} {percent}%" if percent is not None else f"{label} --"
+    draw.text((width / 2, height * 0.35), text, fill="white", anchor="mm", font=_font(height // 6))
+    margin, top, bottom = width // 8, int(height * 0.6), int(height * 0.75)
+    draw.rectangle((margin, top, width - margin, bottom), outline="white")
+    if percent:
+        filled = margin + (width - 2 * margin) * min(percent, 100) // 100
+        draw.rectangle((margin, top, filled, bottom), fill="white")
+    return image
+
+
+def clock_tile() -> LiveTile:
+    # Polled every second, but only redrawn when the minute changes
+    return LiveTile("clock", lambda value, size: draw_text(value, size),
+                    source=lambda: time.strftime("%H:%M"), interval=1.0)
+
+
+def _cpu_percent() -> int:
+    # 1-minute load average relative to the number of cores
+    return round(os.getloadavg()[0] / (os.cpu_count() or 1) * 100)
+
+
+def cpu_tile() -> LiveTile:
+    return LiveTile("cpu", lambda value, size: draw_gauge(value, "CPU", size), source=_cpu_percent, interval=2.0)
+
+
+def _subscribe_volume(notify: Callable[[Optional[int]], None]) -> Callable[[], None]:
+    backend = get_audio_backend()
+
+    def listener(backend):
+        notify(None if backend.sink_muted else backend.sink_volume)
+
+    backend.add_listener(listener)
+    listener(backend)
+    return lambda: backend.remove_listener(listener)
+
+
+def volume_tile() -> LiveTile:
+    # Pushed by the audio backend, so nothing is polled
+    return LiveTile("volume", lambda value, size: draw_gauge(value, "VOL", size), subscribe=_subscribe_volume)
+
+
+LIVE_TILES: Dict[str, Callable[[], LiveTile]] = {
+    "clock": clock_tile,
+    "cpu": cpu_tile,
+    "volume": volume_tile,
+}
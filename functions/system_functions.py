@@ -1,12 +1,14 @@
 # file: functions/system_functions.py
-import subprocess
+from logger import get_logger
+from .action_runner import action_runner
 
-def open_terminal():
-    cmd = "gnome-terminal"
-    print(cmd)
-    subprocess.Popen(cmd, shell=True)
+logger = get_logger(__name__)
 
-def run_python_code(code="print('Hello')"):
-    cmd = f"python3 -c \"{code}\""
-    print(cmd)
-    subprocess.run(cmd, shell=True)
+
+async def open_terminal():
+    logger.debug("Opening terminal")
+    await action_runner.run("open_terminal", ["gnome-terminal"], detach=True)
+
+async def run_python_code(code="print('Hello')"):
+    logger.debug("Running python code: %s", code)
+    await action_runner.run("run_python_code", ["python3", "-c", code], timeout=30)
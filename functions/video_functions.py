@@ -1,13 +1,16 @@
 # file: functions/video_functions.py
-import subprocess
+from logger import get_logger
+from .action_runner import action_runner
 
-def open_obs():
-    cmd = "obs --start"
-    print(cmd)
-    subprocess.Popen(cmd, shell=True)
+logger = get_logger(__name__)
 
-def toggle_recording():
-    print("Toggling recording in OBS")
 
-def change_scene(scene_name="Scene"):
-    print(f"Changing scene to {scene_name}")
+async def open_obs():
+    logger.debug("Opening OBS")
+    await action_runner.run("open_obs", ["obs", "--start"], detach=True)
+
+async def toggle_recording():
+    logger.info("Toggling recording in OBS")
+
+async def change_scene(scene_name="Scene"):
+    logger.info("Changing scene to %s", scene_name)
@@ -1,4 +1,221 @@
+# file: logger.py
+"""
+Logging for the whole application. Modules log through `logger = get_logger(__name__)`
+with %-style arguments, so messages are only formatted if a handler keeps them.
 
+Records are handed to a background thread through a queue and written to stderr
+there, so a log call never waits on the terminal. Recent records are also kept
+in a small in-memory ring buffer; dump_recent() (or SIGUSR2 after
+install_dump_signal()) prints it. With STREAMDECK_LOG_RING_LEVEL=DEBUG the ring
+also keeps debug records that never reach stderr: about 10us per call for a
+post-mortem trail, against well under 1us for a debug call that is filtered out.
+
+Environment:
+    STREAMDECK_LOG_LEVEL       stderr level (default INFO)
+    STREAMDECK_LOG_LEVELS      per-module levels, e.g. "classes.page=DEBUG,functions=WARNING"
+    STREAMDECK_LOG_RING        records kept in the ring buffer (default 2000, 0 disables it)
+    STREAMDECK_LOG_RING_LEVEL  lowest level kept in the ring buffer (default INFO)
+"""
+import atexit
 import logging
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
-logger = logging.getLogger(__name__)
\ No newline at end of file
+import os
+import queue
+import sys
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
+
+FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+
+# Per the logging HOWTO's optimization notes: skip what FORMAT never shows.
+# Without _srcfile no record walks the stack to find its caller.
+logging._srcfile = None
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+
+# Arguments of these types can't change after the call, so formatting them later is safe
+_SCALARS = (str, int, float, bool, bytes, type(None))
+
+
+def _freeze_args(record: logging.LogRecord) -> logging.LogRecord:
+    """
+    Format the message now if any argument could be mutated before a handler reads it.
+    """
+    args = record.args
+    if args and not all(type(arg) in _SCALARS for arg in (args.values() if isinstance(args, dict) else args)):
+        record.msg = record.getMessage()
+        record.args = None
+    return record
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Queues the record with scalar arguments still unformatted; the listener
+    thread formats it. Anything else (a dict, a list, an object) is formatted
+    here, so the log shows its value at the time of the call.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return _freeze_args(record)
+
+
+class _ModuleLevelFilter(logging.Filter):
+    """
+    Passes a record if it reaches the level configured for its module (the
+    longest matching logger name prefix), or the default level otherwise.
+    """
+    def __init__(self, default: int, levels: Dict[str, int]):
+        super().__init__()
+        self.default = default
+        self.levels = levels
+        self._thresholds: Dict[str, int] = {}
+
+    def threshold(self, name: str) -> int:
+        threshold = self._thresholds.get(name)
+        if threshold is None:
+            threshold = self.default
+            prefix = name
+            while prefix:
+                if prefix in self.levels:
+                    threshold = self.levels[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._thresholds[name] = threshold
+        return threshold
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= self.threshold(record.name)
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keeps the last 'capacity' records, for dumping on demand. Only messages with
+    mutable arguments are formatted up front (see _freeze_args).
+    """
+    def __init__(self, capacity: int, level: int = logging.DEBUG):
+        super().__init__(level)
+        self.records: deque = deque(maxlen=capacity)
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # deque.append is atomic, so skip the handler lock on this hot path
+        if record.levelno >= self.level:
+            self.records.append(_freeze_args(record))
+            return True
+        return False
+
+    def emit(self, record: logging.LogRecord):
+        self.records.append(record)
+
+
+def _parse_level(value: str) -> int:
+    level = logging.getLevelName(value.strip().upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level {value!r}")
+    return level
+
+
+def _parse_levels(spec: str) -> Dict[str, int]:
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = _parse_level(level)
+    return levels
+
+
+_listener: Optional[QueueListener] = None
+_ring: Optional[RingBufferHandler] = None
+_formatter = logging.Formatter(FORMAT)
+
+
+def configure(level: Optional[str] = None, levels: Optional[Dict[str, str]] = None,
+              ring_size: Optional[int] = None, ring_level: Optional[str] = None):
+    """
+    (Re)build the logging pipeline. Arguments default to the STREAMDECK_LOG_* environment.
+    """
+    global _listener, _ring
+    console_level = _parse_level(level or os.environ.get("STREAMDECK_LOG_LEVEL", "INFO"))
+    module_levels = ({name: _parse_level(value) for name, value in levels.items()} if levels is not None
+                     else _parse_levels(os.environ.get("STREAMDECK_LOG_LEVELS", "")))
+    if ring_size is None:
+        ring_size = int(os.environ.get("STREAMDECK_LOG_RING", "2000"))
+    ring_threshold = _parse_level(ring_level or os.environ.get("STREAMDECK_LOG_RING_LEVEL", "INFO"))
+
+    shutdown()
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(_formatter)
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, console)
+    _listener.start()
+
+    lowest = min(console_level, *module_levels.values()) if module_levels else console_level
+    # The handler level rejects most records before the per-module filter has to look
+    queue_handler = _DeferredQueueHandler(log_queue)
+    queue_handler.setLevel(lowest)
+    queue_handler.addFilter(_ModuleLevelFilter(console_level, module_levels))
+    handlers: List[logging.Handler] = [queue_handler]
+    if ring_size > 0:
+        _ring = RingBufferHandler(ring_size, ring_threshold)
+        handlers.append(_ring)
+        lowest = min(lowest, ring_threshold)
+    else:
+        _ring = None
+
+    root = logging.getLogger()
+    root.handlers[:] = handlers
+    # Loggers only create records at or above this; the handlers filter further
+    root.setLevel(lowest)
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(min(module_level, ring_threshold) if _ring else module_level)
+
+
+def shutdown():
+    """
+    Flush queued records to stderr and stop the background thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def recent_records(limit: Optional[int] = None) -> List[logging.LogRecord]:
+    if _ring is None:
+        return []
+    records = list(_ring.records)
+    return records[-limit:] if limit else records
+
+
+def dump_recent(stream=None, limit: Optional[int] = None):
+    """
+    Write the ring buffer, oldest first, to 'stream' (default stderr).
+    """
+    stream = stream or sys.stderr
+    records = recent_records(limit)
+    stream.write(f"--- last {len(records)} log records ---\n")
+    for record in records:
+        stream.write(_formatter.format(record) + "\n")
+    stream.flush()
+
+
+def install_dump_signal(signum: Optional[int] = None):
+    """
+    Dump the ring buffer on SIGUSR2 (or 'signum'). Must be called from the running event loop.
+    """
+    import asyncio
+    import signal
+
+    try:
+        asyncio.get_running_loop().add_signal_handler(signum or signal.SIGUSR2, dump_recent)
+    except (NotImplementedError, AttributeError, RuntimeError) as e:  # e.g. Windows
+        logger.warning("Log dump signal not available: %s", e)
+
+
+configure()
+atexit.register(shutdown)
+
+# For code that has no module of its own to name its logger after
+logger = get_logger("streamdeck")
@@ -1,228 +1,241 @@
+import time
+
+# Before any other import, so the startup profile includes them
+STARTED = time.perf_counter()
+
 import asyncio
-import io
 import os
 import sys
+from typing import Dict, Optional
+
+# PIL, cairosvg and the StreamDeck USB stack are imported on first use:
+# a warm start shows its first page from the frame store without rasterizing anything
+from classes.device_monitor import DeviceMonitor, close_deck, list_decks, open_deck
+from classes.events import ButtonPress, DialPress, LedSwipe, LedTap, RenderKey, RenderPage
+from classes.frame_store import DEFAULT_FRAME_STORE_PATH, FrameStore
+from classes.icon_cache import icon_cache
+from classes.page_config import ConfigError, PageTree, load_config, register_binding
+from classes.page_manager import PageManager
+from classes.render_pipeline import render_pipeline
+from functions.audio_backend import get_audio_backend
+from logger import get_logger, install_dump_signal
+from tracing import StartupProfile, tracer
 
-import cairosvg
-from PIL import Image, ImageChops
-from StreamDeck.DeviceManager import DeviceManager
-from StreamDeck.Devices.StreamDeck import TouchscreenEventType, DialEventType
+logger = get_logger(__name__)
+
+startup = StartupProfile(STARTED)
+startup.add("import", time.perf_counter() - STARTED)
+
+# One PageManager per connected deck, keyed by the deck object the device callbacks receive
+managers: Dict[int, PageManager] = {}
+
+# Pages, buttons, dials and their actions; see config/pages.schema.json.
+# A deck with serial ABC123 uses config/pages.ABC123.json instead, if it exists.
+PAGES_CONFIG = os.environ.get("STREAMDECK_PAGES", "config/pages.json")
+# Seconds between checks for decks being plugged in or out
+HOTPLUG_INTERVAL = float(os.environ.get("STREAMDECK_HOTPLUG_INTERVAL", "1.0"))
+# Frames of the first page, reused by the next start; set to "" to disable
+frame_store = FrameStore(os.environ.get("STREAMDECK_FRAME_STORE", DEFAULT_FRAME_STORE_PATH) or None)
+
+
+def manager_for(deck) -> PageManager:
+    return managers[id(deck)]
 
-from classes.base import ItemState
-from classes.page import Page
-from classes.page_manager import PageManager
-from functions.audio_functions import toggle_mic, control_volume
-from logger import logger
 
-manager = PageManager()
+def deck_config_path(serial: str) -> str:
+    root, ext = os.path.splitext(PAGES_CONFIG)
+    path = f"{root}.{serial}{ext}"
+    return path if os.path.exists(path) else PAGES_CONFIG
 
-def set_key_image(deck, row, col, svg_path):
+def traced_callback(callback):
     """
-    Helper to load an SVG, invert if needed, and set it on the specified key (row,col).
-    We'll do row*4+col to get key_index for a 4x2 deck. If your device is 4x2, that means 8 keys total.
+    Time a device callback as the 'receive' stage of the trace.
     """
-    if not os.path.exists(svg_path):
-        logger.warning(f"Missing icon file: {svg_path}")
-        return
-
-    key_index = row * 4 + col
-    # Convert SVG to PNG
-    png_data = cairosvg.svg2png(url=svg_path)
-
-    # Query the key dimensions
-    key_w, key_h = deck.key_image_format()["size"]
-    with Image.open(io.BytesIO(png_data)).convert("RGBA") as icon:
-        icon = icon.resize((key_w, key_h), Image.LANCZOS)
-        # Split into RGBA channels
-        r, g, b, alpha = icon.split()
-
-        # Invert ONLY the RGB channels
-        rgb = Image.merge("RGB", (r, g, b))
-        rgb_inverted = ImageChops.invert(rgb)
-
-        # Merge back with original alpha
-        icon_inverted = Image.merge("RGBA", (*rgb_inverted.split(), alpha))
-
-        # Now create a new black background
-        # and paste the inverted icon onto it using the alpha mask
-        final_img = Image.new("RGB", (key_w, key_h), color="black")
-        final_img.paste(icon_inverted, mask=icon_inverted.split()[3])
-        final_bytes = io.BytesIO()
-        final_img.save(final_bytes, format="JPEG")
-        deck.set_key_image(key_index, final_bytes.getvalue())
+    async def wrapper(*args):
+        with tracer.span("receive", callback=callback.__name__):
+            await callback(*args)
+    wrapper.__name__ = callback.__name__
+    return wrapper
 
+@traced_callback
 async def on_key_change(deck, key_index, pressed):
     """
     Convert (key_index) => (row, col), then forward to manager.
     """
-    logger.debug(f"Key change: key_index={key_index}, pressed={pressed}")
+    logger.debug("Key change: key_index=%s, pressed=%s", key_index, pressed)
     # Only handle press down
     if pressed:
-        row = key_index // 4
-        col = key_index % 4
-        await manager.handle_event(("button_press", row, col))
-        await manager.render_current_page()
-
+        tracer.input_received()
+        manager = manager_for(deck)
+        row = key_index // deck.KEY_COLS
+        col = key_index % deck.KEY_COLS
+        manager.post(ButtonPress(row, col))
+        # Cheap when nothing changed: only keys with a new frame are written,
+        # and a burst of presses collapses into a single pending redraw
+        manager.post(RenderPage())
+
+@traced_callback
 async def on_dial_callback(deck, dial_index, dial_event_type, data):
-    logger.debug(f"Dial event: dial_index={dial_index}, event_type={dial_event_type}, data={data}")
+    from StreamDeck.Devices.StreamDeck import DialEventType
+
+    logger.debug("Dial event: dial_index=%s, event_type=%s, data=%s", dial_index, dial_event_type, data)
+    manager = manager_for(deck)
     if dial_event_type == DialEventType.PUSH:
         if data:  # pressed
-            await manager.handle_event(("dial_press", dial_index))
+            tracer.input_received()
+            manager.post(DialPress(dial_index))
     elif dial_event_type == DialEventType.TURN:
+        tracer.input_received()
         steps = data  # + or - int
-        direction = "right" if steps > 0 else "left"
-        await manager.handle_event(("dial_rotate", dial_index, direction, abs(steps)))
+        # Fast spins deliver many ticks; the manager merges them into one rotation
+        manager.rotate_dial(dial_index, steps)
 
+@traced_callback
 async def on_touch_event(deck, event_type, value):
     """
     event_type = SHORT, LONG, DRAG
     value = { 'x':..., 'y':..., 'x_out':..., 'y_out':...}
     """
-    logger.debug(f"Touch event: event_type={event_type}, value={value}")
+    from StreamDeck.Devices.StreamDeck import TouchscreenEventType
+
+    logger.debug("Touch event: event_type=%s, value=%s", event_type, value)
+    tracer.input_received()
+    manager = manager_for(deck)
     if event_type == TouchscreenEventType.DRAG:
         x_in, y_in = value["x"], value["y"]
         x_out, y_out = value["x_out"], value["y_out"]
         if abs(x_in - x_out) > abs(y_in - y_out):
             direction = "left" if x_in > x_out else "right"
-            await manager.handle_event(("led_swipe", direction))
+            manager.post(LedSwipe(direction))
         # else maybe up/down
     elif event_type == TouchscreenEventType.SHORT:
-        await manager.handle_event(("led_tap", value["x"], value["y"]))
+        manager.post(LedTap(value["x"], value["y"]))
     elif event_type == TouchscreenEventType.LONG:
-        logger.info(f"Long press at x={value['x']}, y={value['y']}")
+        logger.info("Long press at x=%s, y=%s", value['x'], value['y'])
 
-def initialize_and_wire_buttons(deck):
+def bind_source_muted(button, manager):
     """
-    Initializes the pages and buttons, and attaches the logic for navigation and actions.
+    Keep a two-state button showing the real microphone state (state 1 = muted),
+    including changes made outside the deck; the audio backend pushes them to us.
     """
-    deck.open()
-    deck.reset()
-    deck.set_brightness(50)
+    def sync(backend):
+        if backend.source_muted is None:
+            return
+        state_index = 1 if backend.source_muted else 0
+        if button.current_state_index != state_index:
+            button.current_state_index = state_index
+            if manager.current_page is button.super:
+                manager.post(RenderKey(*button.position))
 
-    # 1) Let manager know about the deck
-    manager.set_deck(deck)
+    get_audio_backend().add_listener(sync)
+    sync(get_audio_backend())
 
-    # 2) Register callbacks
+
+register_binding("source_muted", bind_source_muted)
+
+
+def build_page_tree(manager: PageManager, config, path: str = PAGES_CONFIG) -> PageTree:
+    """
+    Wrap the validated page config. Only the root page is built here; the others
+    are built the first time they are navigated to.
+    """
+    tree = PageTree(manager, config)
+    logger.info("Loaded %s pages from %s for %s", len(tree.specs), path, manager.name)
+    return tree
+
+
+def attach_deck(deck, manager: PageManager):
+    """
+    Route a deck's callbacks to its manager. Called again with the new deck object after a reconnect.
+    """
+    for key in [key for key, known in managers.items() if known is manager]:
+        del managers[key]
+    managers[id(deck)] = manager
     deck.set_key_callback_async(on_key_change)
     deck.set_dial_callback_async(on_dial_callback)
     deck.set_touchscreen_callback_async(on_touch_event)
 
-    # Build pages
-
-
-    ###
-    # MAIN PAGE
-    ###
-    main_page = Page(manager,"Main")
-
-    content_page = main_page.create_child(
-        "Content",
-        "Icons/movie-open-outline.svg",
-        (0,3))
-    settings_page = main_page.create_child(
-        "Settings",
-        "Icons/cog.svg",
-        (1,3))
-
-    sound_page = settings_page.create_child(
-        "Sound",
-        "Icons/speaker-multiple.svg",
-        (0,3)
-    )
-
-    mute_button = sound_page.create_button(
-        (0,3),
-        [
-            ItemState(
-            "Icons/volume-high.svg",
-            "Mute"
-            ),
-            ItemState(
-            "Icons/volume-mute.svg",
-                "Unmute"
-            )
-        ],
-        toggle_mic
-    )
-
-    volume_dial = sound_page.create_dial(
-        1,
-        [
-            ItemState(
-                "Icons/volume-minus.svg",
-                "Volume down"
-            ),
-            ItemState(
-                "Icons/volume-medium.svg",
-                "Volume"
-            ),
-            ItemState(
-                "Icons/volume-plus.svg",
-                "Volume up"
-            )
-        ],
-        control_volume
-    )
-
-    video_page = settings_page.create_child(
-         "Video",
-        "Icons/camera.svg",
-        (1,3)
-        )
-
-    display_page = settings_page.create_child(
-        "Display",
-        "Icons/monitor.svg",
-        (1,2)
-    )
-
-
-    return {
-        "main": main_page,
-        "content": content_page,
-        "settings": settings_page,
-        "sound": sound_page,
-        "video": video_page,
-        "display": display_page,
-    }
-
 
-async def main():
-    logger.info("Starting application...")
+async def start_deck(deck, serial: str, default_config) -> Optional[PageManager]:
+    """
+    Give a newly opened deck its own PageManager and page tree and show the root page.
+    Returns None (and leaves the other decks running) if the deck cannot be used.
+    """
+    path = deck_config_path(serial)
+    try:
+        config = default_config if path == PAGES_CONFIG else load_config(path)
+        # 1) Let manager know about the deck
+        manager = PageManager(name=serial)
+        manager.set_deck(deck)
+        # Build pages; this also checks the config fits this deck's keys and dials
+        tree = build_page_tree(manager, config, path)
+    except ConfigError as e:
+        logger.error("Invalid page config for %s %s: %s", deck.deck_type(), serial, e)
+        await asyncio.to_thread(close_deck, deck)
+        return None
 
-    decks = DeviceManager().enumerate()
-    if not decks:
-        logger.error("No StreamDeck found.")
-        sys.exit(0)
+    # 2) Register callbacks
+    attach_deck(deck, manager)
 
-    deck = decks[0]
-    deck.open()
-    deck.reset()
-    deck.set_brightness(50)
+    with startup.phase("first_frame"):
+        await manager.set_current_page(tree.root)
+    startup.frame_shown()
+    manager.start()
+    logger.info("Started %s %s (%sx%s keys)", deck.deck_type(), serial, deck.KEY_ROWS, deck.KEY_COLS)
+    return manager
 
-    # 1) Let manager know about the deck
-    manager.set_deck(deck)
 
-    # 2) Register callbacks
-    deck.set_key_callback_async(on_key_change)
-    deck.set_dial_callback_async(on_dial_callback)
-    deck.set_touchscreen_callback_async(on_touch_event)
+async def main():
+    logger.info("Starting application...")
 
-    # Build pages
-    pages_dict = initialize_and_wire_buttons(deck)
-    # The 'main' page
-    main_page = pages_dict["main"]
-    await manager.set_current_page(main_page)
+    # A broken config should fail before we touch the device
+    try:
+        with startup.phase("config"):
+            config = load_config(PAGES_CONFIG)
+    except ConfigError as e:
+        logger.error("Invalid page config: %s", e)
+        sys.exit(1)
+
+    with startup.phase("audio"):
+        await get_audio_backend().start()
+    with startup.phase("frame_store"):
+        stored = frame_store.load(icon_cache)
+    # Every deck runs on this one event loop; icons rendered for one are cached for all.
+    # Decks unplugged later keep their PageManager and get their frames back on reconnect.
+    monitor = DeviceMonitor(on_new_deck=lambda deck, serial: start_deck(deck, serial, config),
+                            on_attach=attach_deck, interval=HOTPLUG_INTERVAL,
+                            enumerate_decks=startup.timed("device_open", list_decks),
+                            open_deck=startup.timed("device_open", open_deck))
+    icon_cache.start_recording()
+    await monitor.poll()
+    first_frames = icon_cache.stop_recording()
+    if not monitor.managers:
+        logger.warning("No StreamDeck found yet; waiting for one to be plugged in.")
+    elif first_frames.keys() != stored.keys():
+        # New or changed icons on the first page; next time they come from the store
+        await asyncio.to_thread(frame_store.save, first_frames)
+    startup.notes["frames_from_store"] = len(first_frames.keys() & stored.keys())
+    startup.notes["frames_rendered"] = len(first_frames.keys() - stored.keys())
+    startup.finish()
+    # Latency histograms: kill -USR1 <pid>, or connect to STREAMDECK_TRACE_SOCKET
+    tracer.install_signal_handler()
+    # Recent log records (see logger.py): kill -USR2 <pid>
+    install_dump_signal()
+    if os.environ.get("STREAMDECK_TRACE_SOCKET"):
+        await tracer.serve(os.environ["STREAMDECK_TRACE_SOCKET"])
 
     logger.info("Ready. Press Ctrl+C to exit.")
     try:
-        while True:
-            await asyncio.sleep(0.1)  # keep the event loop alive
+        await monitor.run()  # keeps the event loop alive
     except KeyboardInterrupt:
         pass
     finally:
-        deck.reset()
-        deck.close()
+        await asyncio.gather(*(manager.stop() for manager in monitor.managers.values()))
+        await tracer.close()
+        await get_audio_backend().stop()
+        render_pipeline.shutdown()
+        for manager in monitor.attached():
+            close_deck(manager.deck)
 
 
 if __name__ == "__main__":
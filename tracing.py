@@ -0,0 +1,305 @@
+# file: tracing.py
+"""
+Lightweight latency tracing for the input and render pipeline.
+
+Every stage is timed into a log2 histogram (cheap enough to leave on). Stages:
+  receive         device callback, from USB read thread to queued event
+  dispatch        consumer handing an event to the current page (includes the action)
+  action          a button/dial/LED callback
+  rasterize       SVG -> resized RGBA (render worker threads only, not processes)
+  encode          RGB -> JPEG (render worker threads only)
+  render_batch    one pipeline job, from submission to result
+  key_write       deck.set_key_image
+  touch_write     deck.set_touchscreen_image
+  press_to_pixel  device input to the first device write it caused
+
+Dump the histograms with `kill -USR1 <pid>` (logged) or by connecting to the
+unix socket in STREAMDECK_TRACE_SOCKET (JSON). With STREAMDECK_TRACE_FILE set,
+individual spans are also kept and written in Chrome trace format, which
+chrome://tracing and https://ui.perfetto.dev can open.
+
+StartupProfile splits the time to the first frame into import, config,
+device open and first-frame phases; main.py logs it once the decks are up.
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Histogram:
+    """
+    Latency counts in power-of-two microsecond buckets: bucket n holds durations
+    below 2**n us, so 32 buckets cover up to about an hour.
+    """
+    BUCKETS = 32
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, duration_ns: int):
+        bucket = min(self.BUCKETS - 1, (max(0, duration_ns) // 1000).bit_length())
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Upper bound, in milliseconds, of the bucket holding the given fraction of samples.
+        """
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min((1 << bucket) / 1000.0, self.max_ns / 1e6)
+        return self.max_ns / 1e6
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max_ns / 1e6,
+            # Non-empty buckets only, keyed by their upper bound in microseconds
+            "buckets_us": {1 << bucket: count for bucket, count in enumerate(self.counts) if count},
+        }
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "stage", "args", "start")
+
+    def __init__(self, tracer: 'Tracer', stage: str, args: Optional[dict]):
+        self.tracer = tracer
+        self.stage = stage
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.stage, time.perf_counter_ns() - self.start, self.start, self.args)
+        return False
+
+
+class Tracer:
+    """
+    Collects per-stage histograms and, optionally, individual spans for a trace file.
+    """
+    def __init__(self, enabled: bool = True, trace_file: Optional[str] = None, max_spans: int = 200_000):
+        self.enabled = enabled
+        self.trace_file = trace_file
+        self.histograms: Dict[str, Histogram] = {}
+        self._spans: deque = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._input_at: Optional[int] = None
+        # A press that never changes a key must not be charged to the next write
+        self.input_timeout_ns = 2_000_000_000
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def span(self, stage: str, **args):
+        """
+        Time a block: `with tracer.span("encode"): ...`
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage, args or None)
+
+    def record(self, stage: str, duration_ns: int, start_ns: Optional[int] = None, args: Optional[dict] = None):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.record(duration_ns)
+            if self.trace_file:
+                if start_ns is None:
+                    start_ns = time.perf_counter_ns() - duration_ns
+                self._spans.append((stage, start_ns, duration_ns, threading.get_ident(), args))
+
+    def input_received(self):
+        """
+        Note a device input; the next device write completes its press_to_pixel sample.
+        """
+        if self.enabled and self._input_at is None:
+            self._input_at = time.perf_counter_ns()
+
+    def pixels_written(self):
+        if self._input_at is None:
+            return
+        now = time.perf_counter_ns()
+        elapsed, self._input_at = now - self._input_at, None
+        if elapsed <= self.input_timeout_ns:
+            self.record("press_to_pixel", elapsed, now - elapsed)
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {stage: histogram.as_dict() for stage, histogram in sorted(self.histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self._spans.clear()
+        self._input_at = None
+
+    def dump(self):
+        """
+        Log a one-line summary per stage, and write the trace file if one is configured.
+        """
+        for stage, stats in self.stats().items():
+            logger.info("trace %-15s n=%-6d mean=%.3fms p50<=%.3fms p99<=%.3fms max=%.3fms", stage, stats["count"],
+                        stats["mean_ms"], stats["p50_ms"], stats["p99_ms"], stats["max_ms"])
+        if self.trace_file:
+            self.write_trace()
+
+    def write_trace(self, path: Optional[str] = None):
+        """
+        Write the recorded spans as a Chrome trace ("X" complete events, microseconds).
+        """
+        path = path or self.trace_file
+        if not path:
+            return
+        with self._lock:
+            spans = list(self._spans)
+        pid = os.getpid()
+        events: List[dict] = []
+        for stage, start_ns, duration_ns, thread_id, args in spans:
+            event = {"name": stage, "cat": "streamdeck", "ph": "X", "pid": pid, "tid": thread_id,
+                     "ts": start_ns / 1000.0, "dur": duration_ns / 1000.0}
+            if args:
+                event["args"] = {key: str(value) for key, value in args.items()}
+            events.append(event)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        os.replace(tmp_path, path)
+        logger.info("Wrote %s trace spans to %s", len(events), path)
+
+    def install_signal_handler(self, signum: Optional[int] = None):
+        """
+        Dump on SIGUSR1 (or 'signum'). Must be called from the running event loop.
+        """
+        import signal
+
+        try:
+            asyncio.get_running_loop().add_signal_handler(signum or signal.SIGUSR1, self.dump)
+        except (NotImplementedError, AttributeError, RuntimeError) as e:  # e.g. Windows
+            logger.warning("Trace dump signal not available: %s", e)
+
+    async def serve(self, path: str):
+        """
+        Answer every connection on the unix socket 'path' with the current stats as JSON.
+        """
+        async def reply(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            writer.write(json.dumps(self.stats(), indent=2).encode() + b"\n")
+            await writer.drain()
+            writer.close()
+
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = await asyncio.start_unix_server(reply, path=path)
+        logger.info("Serving trace stats on %s", path)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self.trace_file:
+            self.write_trace()
+
+
+class StartupProfile:
+    """
+    Where the time to the first frame went. Phases are summed per name (two decks
+    opening add up) and stop counting once finish() is called.
+    """
+    # Imported on demand by the render path; a warm start should not need them
+    HEAVY_MODULES = ("PIL", "cairosvg")
+
+    def __init__(self, start: Optional[float] = None):
+        self.start = time.perf_counter() if start is None else start
+        self.phases: Dict[str, float] = {}
+        self.first_frame_at: Optional[float] = None
+        self.notes: Dict[str, object] = {}
+        self.finished = False
+
+    def add(self, phase: str, seconds: float):
+        if not self.finished:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def timed(self, name: str, func):
+        """
+        func, with every call made before finish() counted towards 'name'. Safe from worker threads.
+        """
+        def wrapper(*args, **kwargs):
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def frame_shown(self):
+        """
+        The first page of the first deck is on the device.
+        """
+        if self.first_frame_at is None:
+            self.first_frame_at = time.perf_counter()
+
+    def report(self) -> dict:
+        report = {f"{phase}_ms": seconds * 1e3 for phase, seconds in self.phases.items()}
+        if self.first_frame_at is not None:
+            report["time_to_first_frame_ms"] = (self.first_frame_at - self.start) * 1e3
+        report["heavy_modules_loaded"] = [name for name in self.HEAVY_MODULES if name in sys.modules]
+        report.update(self.notes)
+        return report
+
+    def finish(self) -> dict:
+        report = self.report()
+        self.finished = True
+        logger.info("Startup: %s", ", ".join(f"{name} {value:.1f}" if isinstance(value, float) else f"{name} {value}"
+                                             for name, value in report.items()))
+        return report
+
+
+tracer = Tracer(
+    enabled=os.environ.get("STREAMDECK_TRACE", "1") != "0",
+    trace_file=os.environ.get("STREAMDECK_TRACE_FILE") or None,
+)